@@ -0,0 +1,208 @@
+# api_stub.py
+"""
+本地模拟的音乐 API（离线测试 / 基准测试用）
+- 实现 /search、/lyric、/song/detail 和封面图片地址，返回内置的模拟数据
+- 可配置延迟、错误率（返回 500）和超时率（挂起到客户端超时）
+- 统计每个接口的请求次数
+
+用法:
+    python api_stub.py --port 3000 --latency 0.05 --error-rate 0.1
+然后把 online_fetcher 中的 API 地址改为 http://127.0.0.1:3000
+
+代码中使用:
+    with StubServer(latency=0.02) as stub:
+        fetcher = online_fetcher.OnlineFetcher(api_url=stub.url, cache_dir=...)
+"""
+import io
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from PIL import Image
+
+
+def make_fixtures(count=50):
+    """
+    生成模拟曲库
+    - 每 5 首中有 1 首没有歌词，每 7 首中有 1 首没有封面（用于测试未命中缓存）
+    :return: [{'id', 'name', 'artists', 'duration', 'lyric', 'pic'}, ...]
+    """
+    songs = []
+    for i in range(1, count + 1):
+        lines = [f"[{(t * 4) // 60:02d}:{(t * 4) % 60:02d}.00]Song {i:03d} 第 {t + 1} 行" for t in range(40)]
+        songs.append({
+            "id": 100000 + i,
+            "name": f"Song {i:03d}",
+            "artists": [f"Artist {i % 10:02d}"],
+            "duration": 180000 + i * 1000,  # 毫秒，与网易云一致
+            "lyric": "" if i % 5 == 0 else "\n".join(lines),
+            "pic": i % 7 != 0,
+        })
+    return songs
+
+
+class StubServer:
+    """模拟 API 服务器（后台线程运行）"""
+
+    def __init__(self, fixtures=None, host="127.0.0.1", port=0,
+                 latency=0.0, jitter=0.0, error_rate=0.0, timeout_rate=0.0, hang=30.0, seed=None):
+        self.songs = fixtures if fixtures is not None else make_fixtures()
+        self.by_id = {s["id"]: s for s in self.songs}
+        self.latency = latency          # 每个请求的固定延迟（秒）
+        self.jitter = jitter            # 额外的随机延迟上限（秒）
+        self.error_rate = error_rate    # 返回 500 的概率
+        self.timeout_rate = timeout_rate  # 挂起 hang 秒不响应的概率
+        self.hang = hang
+        self.counts = Counter()         # 接口 -> 请求次数
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="api-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_counts(self):
+        with self._lock:
+            self.counts.clear()
+
+    def total_requests(self):
+        with self._lock:
+            return sum(self.counts.values())
+
+    # ==================== 接口实现 ====================
+
+    def handle(self, path, query):
+        """
+        :return: (状态码, Content-Type, 响应字节)
+        """
+        endpoint = "img" if path.startswith("/img/") else path
+        with self._lock:
+            self.counts[endpoint] += 1
+            roll = self._random.random()
+            delay = self.latency + self._random.random() * self.jitter
+
+        if roll < self.timeout_rate:
+            time.sleep(self.hang)
+        elif delay:
+            time.sleep(delay)
+        if self.timeout_rate <= roll < self.timeout_rate + self.error_rate:
+            return 500, "application/json", b'{"code":500,"msg":"stub error"}'
+
+        if path == "/search":
+            return self._json(self._search(query.get("keywords", [""])[0], int(query.get("limit", ["5"])[0])))
+        if path == "/lyric":
+            song = self.by_id.get(int(query.get("id", ["0"])[0]))
+            return self._json({"code": 200, "lrc": {"lyric": song["lyric"] if song else ""}})
+        if path == "/song/detail":
+            ids = [int(x) for x in query.get("ids", [""])[0].split(",") if x.strip().isdigit()]
+            return self._json({"code": 200, "songs": [self._detail(i) for i in ids if i in self.by_id]})
+        m = re.match(r"^/img/(\d+)\.jpg$", path)
+        if m and int(m.group(1)) in self.by_id:
+            return 200, "image/jpeg", self._image(int(m.group(1)), query.get("param", [""])[0])
+        return 404, "application/json", b'{"code":404}'
+
+    def _search(self, keywords, limit):
+        words = [w for w in re.split(r"\s+", keywords.lower()) if w]
+        scored = []
+        for song in self.songs:
+            text = f"{song['name']} {' '.join(song['artists'])}".lower()
+            hits = sum(w in text for w in words)
+            if hits:
+                scored.append((-hits, song["id"], song))
+        scored.sort(key=lambda x: x[:2])
+        return {"code": 200, "result": {"songs": [{
+            "id": s["id"], "name": s["name"],
+            "artists": [{"name": a} for a in s["artists"]],
+            "duration": s["duration"], "album": {},
+        } for _, _, s in scored[:limit]]}}
+
+    def _detail(self, song_id):
+        song = self.by_id[song_id]
+        pic = f"{self.url}/img/{song_id}.jpg" if song["pic"] else None
+        return {"id": song_id, "name": song["name"], "al": {"picUrl": pic}}
+
+    def _image(self, song_id, param):
+        # 支持 ?param=NyN 缩放参数，默认返回 1000×1000 的“原图”
+        m = re.match(r"^(\d+)y(\d+)$", param or "")
+        size = (int(m.group(1)), int(m.group(2))) if m else (1000, 1000)
+        color = ((song_id * 37) % 256, (song_id * 91) % 256, (song_id * 53) % 256)
+        buf = io.BytesIO()
+        Image.new("RGB", size, color).save(buf, "JPEG", quality=90)
+        return buf.getvalue()
+
+    @staticmethod
+    def _json(obj):
+        return 200, "application/json", json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _make_handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            try:
+                status, ctype, body = stub.handle(url.path, parse_qs(url.query))
+            except Exception as e:
+                status, ctype, body = 500, "text/plain", str(e).encode("utf-8")
+            try:
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # 客户端已超时断开
+
+        def log_message(self, format, *args):
+            pass  # 不输出访问日志
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟音乐 API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--songs", type=int, default=50, help="模拟曲库歌曲数")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="额外随机延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的概率")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="挂起不响应的概率")
+    args = parser.parse_args()
+
+    stub = StubServer(make_fixtures(args.songs), args.host, args.port, args.latency,
+                      args.jitter, args.error_rate, args.timeout_rate)
+    print(f"[模拟API] 运行于 {stub.url}，共 {len(stub.songs)} 首（Ctrl+C 退出）")
+    stub.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
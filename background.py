@@ -0,0 +1,239 @@
+# background.py
+"""
+模糊背景引擎
+- 模糊背景只取决于封面和窗口尺寸：每个 (封面摘要, 窗口尺寸) 只做一次
+  模糊 + 压暗，得到比窗口大 10% 的“底图”
+- 在缩小 8 / 16 倍的图上模糊和压暗，再只把动画可能显示到的区域放大；
+  质量由 config.BG_BLUR_QUALITY 控制
+- 动画不再逐帧模糊：默认把整张底图放在 Canvas 上，逐帧只移动位置
+  （Plate.origin）；也可以逐帧从底图裁剪（Plate.frame）
+- 最近几张底图保留在内存中，并以 JPEG 保存在 sinf/bg（可关闭），
+  重启或切回同一张专辑时不用重新模糊
+"""
+import os
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageFilter, ImageEnhance
+import config
+import thumbs
+import utils
+
+SCALE_FACTOR = 1.1  # 底图比窗口大 10%，留出移动空间
+BLUR_RADIUS = 80
+BRIGHTNESS = 0.4
+DRIFT = 0.5         # 实际移动幅度占可移动范围的比例
+
+
+def phase_offset(phase):
+    """
+    动画相位 (0.0 - 4.0) → 偏移 (-1.0 到 1.0)
+    循环：下 → 右 → 上 → 左
+    """
+    if phase < 1.0:
+        x, y = 0.0, phase              # 阶段1: 向下移动
+    elif phase < 2.0:
+        x, y = phase - 1.0, 1.0        # 阶段2: 向右移动
+    elif phase < 3.0:
+        x, y = 1.0, 3.0 - phase        # 阶段3: 向上移动
+    else:
+        x, y = 4.0 - phase, 0.0        # 阶段4: 向左移动
+    # 转换为 -1.0 到 1.0 的范围（中心为0）
+    return (x - 0.5) * 2, (y - 0.5) * 2
+
+
+def plate_size(img_w, img_h, win_w, win_h):
+    """完整底图尺寸：按比例放大到覆盖窗口的 SCALE_FACTOR 倍"""
+    if img_w / img_h > win_w / win_h:
+        new_h = int(win_h * SCALE_FACTOR)
+        new_w = int(new_h * img_w / img_h)
+    else:
+        new_w = int(win_w * SCALE_FACTOR)
+        new_h = int(new_w * img_h / img_w)
+    return new_w, new_h
+
+
+def drift_box(plate_w, plate_h, win_w, win_h):
+    """完整底图中动画可能显示到的区域（窗口 + 两侧 DRIFT 幅度的移动范围），只渲染这一部分"""
+    dx = int((plate_w - win_w) / 2 * DRIFT)
+    dy = int((plate_h - win_h) / 2 * DRIFT)
+    left = (plate_w - win_w) // 2 - dx
+    top = (plate_h - win_h) // 2 - dy
+    return left, top, left + win_w + 2 * dx, top + win_h + 2 * dy
+
+
+# 模糊质量：(缩小倍数, 放大插值)。大半径模糊后图像只剩低频，缩小 8 / 16 倍模糊与原尺寸肉眼无差别
+QUALITY = {
+    "exact": (1, None),                           # 原尺寸高斯模糊（旧实现，仅用于对比）
+    "high": (4, Image.Resampling.BICUBIC),
+    "balanced": (8, Image.Resampling.BILINEAR),
+    "fast": (16, Image.Resampling.BILINEAR),
+}
+
+# 压暗查找表，在缩小后的图上应用
+_DIM_LUT = [int(v * BRIGHTNESS) for v in range(256)] * 3
+
+
+def render_plate(src, win_w, win_h, quality=None):
+    """
+    生成底图（耗时操作）：缩小 → 模糊 + 压暗 → 只把可能显示到的区域放大
+    :param quality: QUALITY 中的键，默认 config.BG_BLUR_QUALITY
+    :return: drift_box 区域大小的图片
+    """
+    src = src.convert("RGB")
+    size = plate_size(src.width, src.height, win_w, win_h)
+    box = drift_box(*size, win_w, win_h)
+    factor, resample = QUALITY[quality or config.BG_BLUR_QUALITY]
+    if factor == 1:
+        resized = src.resize(size, Image.Resampling.BICUBIC)
+        blurred = resized.filter(ImageFilter.GaussianBlur(radius=BLUR_RADIUS)).crop(box)
+        return ImageEnhance.Brightness(blurred).enhance(BRIGHTNESS)
+
+    small_size = (max(1, round(size[0] / factor)), max(1, round(size[1] / factor)))
+    small = src.resize(small_size, Image.Resampling.BICUBIC)
+    small = small.filter(ImageFilter.GaussianBlur(radius=BLUR_RADIUS / factor)).point(_DIM_LUT)
+    sx = small_size[0] / size[0]
+    sy = small_size[1] / size[1]
+    return small.resize((box[2] - box[0], box[3] - box[1]), resample,
+                        box=(box[0] * sx, box[1] * sy, box[2] * sx, box[3] * sy))
+
+
+class Plate:
+    """一张底图（drift_box 区域）及其对应的窗口尺寸"""
+
+    def __init__(self, image, win_w, win_h):
+        self.image = image
+        self.win_w = win_w
+        self.win_h = win_h
+
+    def fits(self, win_w, win_h):
+        return (self.win_w, self.win_h) == (win_w, win_h)
+
+    def origin(self, offset_x=0.0, offset_y=0.0):
+        """
+        窗口左上角在底图中的位置
+        :param offset_x: X轴偏移 (-1.0 到 1.0)
+        :param offset_y: Y轴偏移 (-1.0 到 1.0)
+        """
+        dx = (self.image.width - self.win_w) / 2
+        dy = (self.image.height - self.win_h) / 2
+        return round(dx * (1 + offset_x)), round(dy * (1 + offset_y))
+
+    def frame(self, offset_x=0.0, offset_y=0.0):
+        """裁剪出窗口大小的一帧"""
+        left, top = self.origin(offset_x, offset_y)
+        return self.image.crop((left, top, left + self.win_w, top + self.win_h))
+
+
+class BackgroundEngine:
+    """模糊背景底图缓存（线程安全）"""
+
+    def __init__(self, thumb_cache, cache_dir=None, memory_items=None, disk_items=None):
+        self.thumbs = thumb_cache
+        self.memory_items = config.BG_PLATE_MEMORY_ITEMS if memory_items is None else memory_items
+        self.disk_items = config.BG_PLATE_DISK_ITEMS if disk_items is None else disk_items
+        self.root = os.path.join(cache_dir or utils.get_cache_dir(), "bg")
+        if self.disk_items > 0:
+            os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.RLock()
+        self._plates = OrderedDict()  # (摘要, 宽, 高) -> Plate
+        self.hits = 0
+        self.disk_hits = 0
+        self.renders = 0
+
+    def plate(self, cover, win_w, win_h):
+        """
+        获取底图
+        :param cover: metadata.LazyCover，None 表示默认封面
+        """
+        key = (_digest(cover), win_w, win_h)
+        with self._lock:
+            plate = self._plates.get(key)
+            if plate is not None:
+                self._plates.move_to_end(key)
+                self.hits += 1
+                return plate
+
+        image = self._load(key)
+        if image is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            image = render_plate(self.thumbs.get(cover, config.BG_SOURCE_SIZE), win_w, win_h)
+            with self._lock:
+                self.renders += 1
+            self._save(key, image)
+
+        plate = Plate(image, win_w, win_h)
+        with self._lock:
+            self._plates[key] = plate
+            while len(self._plates) > self.memory_items:
+                self._plates.popitem(last=False)
+        return plate
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "disk_hits": self.disk_hits,
+                    "renders": self.renders, "plates": len(self._plates)}
+
+    # ==================== 磁盘缓存 ====================
+
+    def _path(self, key):
+        digest, w, h = key
+        return os.path.join(self.root, f"{digest}_{w}x{h}_{config.BG_BLUR_QUALITY}.jpg")
+
+    def _load(self, key):
+        if self.disk_items <= 0:
+            return None
+        path = self._path(key)
+        try:
+            img = Image.open(path)
+            img.load()
+            os.utime(path)  # 刷新访问时间，淘汰时保留
+            return img
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, key, image):
+        if self.disk_items <= 0:
+            return
+        path = self._path(key)
+        try:
+            tmp = path + ".tmp"
+            image.save(tmp, "JPEG", quality=90)
+            os.replace(tmp, path)
+            self._evict()
+        except OSError as e:
+            print(f"[背景] 保存底图失败: {e}")
+
+    def _evict(self):
+        """超出数量时删除最久未使用的底图"""
+        files = [os.path.join(self.root, f) for f in os.listdir(self.root) if f.endswith(".jpg")]
+        if len(files) <= self.disk_items:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.disk_items]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _digest(cover):
+    """封面摘要（与缩略图缓存一致），默认封面为 "default" """
+    if cover is None:
+        return "default"
+    if not cover.digest:
+        cover.data()  # 读取字节后才有摘要
+    return cover.digest or "default"
+
+
+# ==================== 全局实例 ====================
+
+_engine = None
+
+def get_background_engine():
+    """获取全局背景引擎"""
+    global _engine
+    if _engine is None:
+        _engine = BackgroundEngine(thumbs.get_thumbnail_cache())
+    return _engine
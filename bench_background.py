@@ -0,0 +1,67 @@
+# bench_background.py
+"""
+模糊背景渲染性能对比
+- utils.process_background（旧版：原尺寸放大 → 裁剪 → GaussianBlur(80) → 压暗，每次调用都完整执行）
+- background.render_plate 各质量档（缩小后模糊 + 压暗，只放大动画可能显示到的区域）
+旧版每帧都要执行一次；新版每个 封面 + 窗口尺寸 只执行一次
+误差为与原尺寸高斯模糊底图（"exact"）相比的平均像素差（0-255）
+
+用法: python bench_background.py [重复次数]
+"""
+import sys
+import time
+from PIL import Image, ImageChops, ImageDraw, ImageStat
+import config
+import utils
+import background
+
+SIZES = [(400, 800), (1920, 1080), (3840, 2160)]
+
+
+def make_cover(size=config.BG_SOURCE_SIZE):
+    """生成带色块和细节的测试封面"""
+    img = Image.new("RGB", (size, size))
+    draw = ImageDraw.Draw(img)
+    for i in range(0, size, 16):
+        draw.rectangle((i, 0, i + 8, size), fill=(i % 256, 80, 255 - i % 256))
+    draw.ellipse((size // 4, size // 4, size * 3 // 4, size * 3 // 4), fill=(250, 220, 40))
+    draw.text((10, 10), "bench", fill=(255, 255, 255))
+    return img
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def diff(a, b):
+    """两张同尺寸图片的平均像素差"""
+    return sum(ImageStat.Stat(ImageChops.difference(a, b)).mean) / 3
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    cover = make_cover()
+    print(f"每项取 {repeat} 次中最快一次")
+    print(f"{'窗口':<12}{'实现':<26}{'耗时 ms':>10}{'加速':>8}{'误差':>8}")
+
+    for w, h in SIZES:
+        base, _ = timed(lambda: utils.process_background(cover, w, h, 0, 0), repeat)
+        _, exact = timed(lambda: background.render_plate(cover, w, h, "exact"), 1)
+        reference = background.Plate(exact, w, h).frame()
+        print(f"{f'{w}x{h}':<12}{'process_background（旧）':<24}{base * 1000:>10.1f}{'1.0x':>8}{'-':>8}")
+
+        rows = [(f"render_plate {q}", q) for q in ("exact", "high", "balanced", "fast")]
+        for name, quality in rows:
+            elapsed, plate = timed(lambda: background.render_plate(cover, w, h, quality), repeat)
+            err = diff(background.Plate(plate, w, h).frame(), reference)
+            print(f"{'':<12}{name:<26}{elapsed * 1000:>10.1f}{base / elapsed:>7.1f}x{err:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+# bench_fetcher.py
+"""
+在线获取基准测试（使用 api_stub 本地模拟 API，不需要网络）
+- 冷启动：空缓存，逐首获取歌词和封面
+- 热缓存：同一个 OnlineFetcher 再获取一遍（应当零请求）
+- 重启后：新建 OnlineFetcher，只从磁盘缓存读取（应当零请求）
+- 并发合并：FetchPipeline 对同一首歌重复提交，请求数应与单次相同
+- 歌词 + 封面同时获取：两个请求共用一次搜索（每首最多一次 /search）
+- 故障：API 全部返回 500 / 全部超时 / 服务未启动，熔断器应限制请求次数
+- 恢复：故障结束后熔断器探测成功，恢复正常获取
+每个场景输出单曲延迟（中位数 / p95）、API 请求次数和缓存命中率
+
+用法:
+    python bench_fetcher.py [歌曲数] [--latency 秒] [--check]
+    --check 时检查请求次数是否符合预期，不符合则以非零状态退出（可用于回归测试）
+"""
+import io
+import sys
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import contextlib
+import api_stub
+import online_fetcher
+import fetch_pipeline
+
+REQUESTS_PER_TRACK = 4  # 冷启动每首最多：搜索 + 歌词 + 详情 + 图片
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def free_port():
+    """一个当前没有服务监听的端口（模拟 API 未启动）"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Bench:
+    def __init__(self, songs, latency):
+        self.fixtures = api_stub.make_fixtures(songs)
+        self.tracks = [(s["name"], s["artists"][0], s["duration"] / 1000) for s in self.fixtures]
+        self.stub = api_stub.StubServer(self.fixtures, latency=latency, hang=2.0, seed=1)
+        self.dirs = []
+        self.results = []
+        self.failures = []
+        self.last_hit_rate = 0.0
+
+    def new_fetcher(self, cache_dir=None, api_url=None, timeout=None, backoff=None):
+        if cache_dir is None:
+            cache_dir = tempfile.mkdtemp(prefix="bench_fetcher_")
+            self.dirs.append(cache_dir)
+        fetcher = online_fetcher.OnlineFetcher(api_url=api_url or self.stub.url, cache_dir=cache_dir)
+        if timeout is not None:
+            fetcher.timeout = timeout
+        if backoff is not None:
+            fetcher.breaker = online_fetcher.CircuitBreaker(base_backoff=backoff, max_backoff=backoff)
+        return fetcher
+
+    def fetch_all(self, fetcher, tracks=None):
+        """逐首获取歌词 + 封面，返回每首的耗时（本轮的缓存命中率记在 self.last_hit_rate）"""
+        before = fetcher.store.stats()
+        times = []
+        with contextlib.redirect_stdout(io.StringIO()):  # 屏蔽获取过程中的日志
+            for t, a, d in tracks or self.tracks:
+                start = time.perf_counter()
+                fetcher.fetch_lyrics(t, a, d)
+                fetcher.fetch_cover(t, a, d)
+                times.append(time.perf_counter() - start)
+        after = fetcher.store.stats()
+        hits = sum(after[k] - before[k] for k in ("hits", "legacy_hits"))
+        lookups = hits + after["misses"] - before["misses"]
+        self.last_hit_rate = hits / lookups if lookups else 0.0
+        return times
+
+    def record(self, name, times, requests, note=""):
+        self.results.append((name, len(times), percentile(times, 0.5), percentile(times, 0.95),
+                             sum(times), requests, self.last_hit_rate, note))
+
+    def expect(self, name, ok, message):
+        if not ok:
+            self.failures.append(f"{name}: {message}")
+
+    # ==================== 场景 ====================
+
+    def run(self):
+        self.stub.start()
+        try:
+            cache_dir = self.cold_and_warm()
+            self.restart(cache_dir)
+            self.coalesce()
+            self.lyrics_and_cover()
+            self.errors()
+            self.timeouts()
+            self.down()
+            self.recovery()
+        finally:
+            self.stub.stop()
+            for d in self.dirs:
+                shutil.rmtree(d, ignore_errors=True)
+
+    def cold_and_warm(self):
+        fetcher = self.new_fetcher()
+        self.stub.reset_counts()
+        times = self.fetch_all(fetcher)
+        cold = self.stub.total_requests()
+        self.record("冷启动", times, cold, str(dict(self.stub.counts)))
+        self.expect("冷启动", cold <= REQUESTS_PER_TRACK * len(self.tracks),
+                    f"{cold} 次请求，超过每首 {REQUESTS_PER_TRACK} 次")
+
+        self.stub.reset_counts()
+        times = self.fetch_all(fetcher)
+        warm = self.stub.total_requests()
+        self.record("热缓存", times, warm, "含已知无歌词/无封面的歌曲")
+        self.expect("热缓存", warm == 0, f"应为 0 次请求，实际 {warm} 次")
+        return fetcher.cache_dir
+
+    def restart(self, cache_dir):
+        fetcher = self.new_fetcher(cache_dir)
+        self.stub.reset_counts()
+        times = self.fetch_all(fetcher)
+        n = self.stub.total_requests()
+        self.record("重启后", times, n, "磁盘缓存 + 未命中缓存")
+        self.expect("重启后", n == 0, f"应为 0 次请求，实际 {n} 次")
+
+    def coalesce(self):
+        fetcher = self.new_fetcher()
+        pipeline = fetch_pipeline.FetchPipeline(fetcher, max_workers=4, background_workers=4, debounce=0)
+        tracks = self.tracks[:10]
+        self.stub.reset_counts()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            futures = []
+            for t, a, d in tracks:
+                for _ in range(3):  # 同一首歌重复提交（播放 + 预取 + 再次播放）
+                    futures.append(pipeline.submit_lyrics(t, a, d, background=True))
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - start
+        pipeline.shutdown()
+        self.last_hit_rate = 0.0  # 空缓存，每首只获取一次
+        n = self.stub.counts["/lyric"]
+        self.record("并发合并", [elapsed / len(tracks)] * len(tracks), self.stub.total_requests(),
+                    f"{len(futures)} 次提交，合并 {pipeline.coalesced} 次")
+        self.expect("并发合并", n <= len(tracks), f"/lyric 请求 {n} 次，应不超过 {len(tracks)} 次")
+
+    def lyrics_and_cover(self):
+        """切歌时歌词和封面同时提交（与 main.play_index 相同），应只搜索一次"""
+        fetcher = self.new_fetcher()
+        pipeline = fetch_pipeline.FetchPipeline(fetcher, max_workers=4, background_workers=4, debounce=0)
+        tracks = self.tracks[:10]
+        self.stub.reset_counts()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            futures = []
+            for t, a, d in tracks:
+                futures.append(pipeline.submit_lyrics(t, a, d, background=True))
+                futures.append(pipeline.submit_cover(t, a, d, background=True))
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - start
+        pipeline.shutdown()
+        self.last_hit_rate = 0.0
+        n = self.stub.counts["/search"]
+        self.record("歌词+封面", [elapsed / len(tracks)] * len(tracks), self.stub.total_requests(),
+                    f"/search {n} 次")
+        self.expect("歌词+封面", n <= len(tracks), f"/search 请求 {n} 次，应不超过 {len(tracks)} 次")
+
+    def errors(self):
+        fetcher = self.new_fetcher()
+        self.stub.error_rate = 1.0
+        self.stub.reset_counts()
+        try:
+            times = self.fetch_all(fetcher)
+        finally:
+            self.stub.error_rate = 0.0
+        n = self.stub.total_requests()
+        self.record("全部 500", times, n, f"熔断器 {fetcher.status()['state']}")
+        self.expect("全部 500", n <= fetcher.breaker.threshold, f"熔断后仍发出请求，共 {n} 次")
+        self.expect("全部 500", not any(fetcher.misses.is_miss(t, a, "lyrics") for t, a, _ in self.tracks),
+                    "请求失败被记为未命中")
+
+    def timeouts(self):
+        fetcher = self.new_fetcher(timeout=0.3)
+        self.stub.timeout_rate = 1.0
+        self.stub.reset_counts()
+        try:
+            times = self.fetch_all(fetcher)
+        finally:
+            self.stub.timeout_rate = 0.0
+        n = self.stub.total_requests()
+        self.record("全部超时", times, n, f"超时 {fetcher.timeout}s，熔断器 {fetcher.status()['state']}")
+        self.expect("全部超时", n <= fetcher.breaker.threshold, f"熔断后仍发出请求，共 {n} 次")
+
+    def down(self):
+        fetcher = self.new_fetcher(api_url=f"http://127.0.0.1:{free_port()}")
+        times = self.fetch_all(fetcher)
+        self.record("服务未启动", times, None, f"熔断器 {fetcher.status()['state']}")
+        self.expect("服务未启动", fetcher.status()["state"] != "closed", "熔断器未打开")
+
+    def recovery(self):
+        fetcher = self.new_fetcher(backoff=0.2)
+        tracks = self.tracks[:10]
+        self.stub.error_rate = 1.0
+        try:
+            self.fetch_all(fetcher, tracks)
+        finally:
+            self.stub.error_rate = 0.0
+        time.sleep(0.3)  # 等待退避结束
+        self.stub.reset_counts()
+        times = self.fetch_all(fetcher, tracks)
+        n = self.stub.total_requests()
+        lyrics = sum(1 for t, a, d in tracks if fetcher.store.get_path(t, a, d, "lyrics"))
+        self.record("故障恢复", times, n, f"恢复后获取歌词 {lyrics} 首")
+        self.expect("故障恢复", fetcher.status()["state"] == "closed", "熔断器未恢复")
+        self.expect("故障恢复", lyrics > 0, "恢复后没有获取到歌词")
+
+    # ==================== 输出 ====================
+
+    def report(self):
+        print(f"{'场景':<8}{'曲数':>6}{'中位数ms':>10}{'p95 ms':>9}{'总计s':>8}{'请求':>6}{'命中率':>8}  备注")
+        for name, n, p50, p95, total, requests, hit_rate, note in self.results:
+            requests = "-" if requests is None else requests  # 服务未启动时无法统计
+            print(f"{name:<8}{n:>6}{p50 * 1000:>10.1f}{p95 * 1000:>9.1f}{total:>8.2f}"
+                  f"{requests:>6}{hit_rate:>8.0%}  {note}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在线获取基准测试（本地模拟 API）")
+    parser.add_argument("songs", nargs="?", type=int, default=30, help="歌曲数")
+    parser.add_argument("--latency", type=float, default=0.02, help="模拟 API 每个请求的延迟（秒）")
+    parser.add_argument("--check", action="store_true", help="检查请求次数，不符合预期时返回非零")
+    args = parser.parse_args()
+
+    bench = Bench(args.songs, args.latency)
+    print(f"{args.songs} 首，模拟延迟 {args.latency * 1000:.0f} ms")
+    bench.run()
+    bench.report()
+
+    if bench.failures:
+        print("\n不符合预期:")
+        for line in bench.failures:
+            print(f"  ✗ {line}")
+        return 1 if args.check else 0
+    print("\n✓ 请求次数均符合预期")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
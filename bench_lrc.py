@@ -0,0 +1,90 @@
+# bench_lrc.py
+"""
+LRC 解析性能对比
+- lrc.parse（统一解析器）
+- 旧版 metadata.parse_lrc_content
+- 旧版 OnlineFetcher._parse_lrc / MusicPlayer._load_lyrics_from_sinf（两者实现相同）
+
+用法: python bench_lrc.py [行数]
+"""
+import re
+import sys
+import timeit
+import lrc
+
+
+# ==================== 旧版解析器（原样保留用于对比） ====================
+
+def legacy_metadata_parse(lrc_text):
+    lyrics = {}
+    times = []
+    lines = lrc_text.splitlines()
+    for line in lines:
+        matches = re.findall(r'\[(\d+):(\d+\.?\d*)\]', line)
+        text = re.sub(r'\[.*?\]', '', line).strip()
+        if matches and text:
+            for m in matches:
+                min_v, sec_v = int(m[0]), float(m[1])
+                time_key = min_v * 60 + sec_v
+                lyrics[time_key] = text
+                times.append(time_key)
+    times.sort()
+    return lyrics, times
+
+
+def legacy_fetcher_parse(lrc_text):
+    lyrics_map = {}
+    time_points = []
+    pattern = r'\[(\d{2}):(\d{2})\.(\d{2,3})\](.*)'
+    for line in lrc_text.split('\n'):
+        match = re.match(pattern, line)
+        if match:
+            minutes = int(match.group(1))
+            seconds = int(match.group(2))
+            milliseconds = int(match.group(3))
+            text = match.group(4).strip()
+            time_in_seconds = minutes * 60 + seconds + milliseconds / 1000
+            if text:
+                lyrics_map[time_in_seconds] = text
+                time_points.append(time_in_seconds)
+    time_points.sort()
+    return lyrics_map, time_points
+
+
+# ==================== 测试数据 ====================
+
+def make_lrc(lines, multi=False):
+    """生成 lines 行歌词；multi=True 时每行带两个时间标签（副歌重复）"""
+    out = ["[ti:Benchmark]", "[ar:Nobody]", "[offset:0]"]
+    for i in range(lines):
+        t = i * 0.37
+        stamp = f"[{int(t // 60):02d}:{t % 60:05.2f}]"
+        if multi:
+            t2 = t + lines * 0.37
+            stamp += f"[{int(t2 // 60):02d}:{t2 % 60:05.2f}]"
+        out.append(f"{stamp}这是第 {i} 行歌词 line {i}")
+    return "\n".join(out)
+
+
+def bench(name, fn, text, repeat=5):
+    number = 3
+    best = min(timeit.repeat(lambda: fn(text), number=number, repeat=repeat)) / number
+    print(f"  {name:<28} {best * 1000:8.2f} ms")
+    return best
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for label, text in (("单时间标签", make_lrc(lines)), ("多时间标签", make_lrc(lines, multi=True))):
+        print(f"[{label}] {lines} 行, {len(text) // 1024} KB")
+        base = bench("legacy metadata", legacy_metadata_parse, text)
+        bench("legacy fetcher / sinf", legacy_fetcher_parse, text)
+        new = bench("lrc.parse", lrc.parse, text)
+        timeline = lrc.parse(text)
+        _, legacy_times = legacy_metadata_parse(text)
+        print(f"  lrc.parse 行数 {len(timeline)}，旧版 metadata 行数 {len(set(legacy_times))}")
+        print(f"  相对旧版 metadata 加速 {base / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
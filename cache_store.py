@@ -0,0 +1,351 @@
+# cache_store.py
+"""
+在线资源缓存（歌词 / 封面）
+- 以归一化的 标题 + 歌手 + 时长 为键，同名不同歌手的歌曲不再互相覆盖
+- 文件存放在 sinf/store/xx/<sha1>.<ext>，索引保存在 sinf/store.db（SQLite），
+  启动时载入内存，查询只需一次字典查找，不再逐个 os.path.exists
+- 命中时只更新内存中的访问时间，随下一次写入 / 淘汰 / close() 批量写回索引
+- 总容量超出 STORE_MAX_BYTES 时按最近访问时间淘汰
+- 先写临时文件再 os.replace，中途退出不会留下半个文件
+- 封面保存下载到的原始字节（不重新编码），索引中记录格式和像素尺寸
+- 兼容旧版 sinf/<标题>.lrc / .jpg：打开时扫描一次，首次命中时迁移进缓存
+"""
+import os
+import time
+import hashlib
+import sqlite3
+import tempfile
+import threading
+import unicodedata
+import config
+import utils
+
+# 类型 -> 默认文件扩展名
+KINDS = {"lyrics": "lrc", "cover": "jpg"}
+# 图片格式 -> 文件扩展名
+IMAGE_EXTS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif", "BMP": "bmp"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key     TEXT NOT NULL,
+    kind    TEXT NOT NULL,
+    file    TEXT NOT NULL,
+    bytes   INTEGER NOT NULL,
+    atime   REAL NOT NULL,
+    format  TEXT,
+    width   INTEGER,
+    height  INTEGER,
+    PRIMARY KEY (key, kind)
+);
+"""
+# 旧版索引缺少的列
+_ADDED_COLUMNS = (("format", "TEXT"), ("width", "INTEGER"), ("height", "INTEGER"))
+
+
+def normalize(text):
+    """归一化标题/歌手：全角转半角、忽略大小写、只保留字母数字（含中日韩文字）"""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return "".join(ch for ch in text if ch.isalnum())
+
+
+def song_key(title, artist, duration=None):
+    """歌曲缓存键：归一化标题 + 歌手 + 时长（秒）"""
+    return f"{normalize(title)}|{normalize(artist)}|{round(duration or 0)}"
+
+
+def safe_filename(title):
+    """旧版缓存使用的文件名（移除不合法字符）"""
+    invalid_chars = '<>:"/\\|?*'
+    safe_name = title
+    for char in invalid_chars:
+        safe_name = safe_name.replace(char, '_')
+    if len(safe_name) > 200:
+        safe_name = safe_name[:200]
+    return safe_name
+
+
+class CacheStore:
+    """歌词 / 封面文件缓存（线程安全）"""
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or utils.get_cache_dir()
+        self.root = os.path.join(self.cache_dir, "store")
+        self.max_bytes = max_bytes or config.STORE_MAX_BYTES
+        os.makedirs(self.root, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(self.cache_dir, "store.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(entries)")}
+        for name, decl in _ADDED_COLUMNS:
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE entries ADD COLUMN {name} {decl}")
+        self._conn.commit()
+
+        # 内存索引: (key, kind) -> [file, bytes, atime, format, width, height]
+        self._index = {}
+        for key, kind, file, nbytes, atime, fmt, width, height in self._conn.execute(
+                "SELECT key, kind, file, bytes, atime, format, width, height FROM entries"):
+            self._index[(key, kind)] = [file, nbytes, atime, fmt, width, height]
+        self._total = sum(e[1] for e in self._index.values())
+        self._touched = set()  # 访问时间尚未写回索引的键
+        self._legacy = _scan_legacy(self.cache_dir)  # (旧文件名, 类型) -> 旧版缓存路径
+        self.hits = 0
+        self.misses = 0
+        self.legacy_hits = 0
+
+    # ==================== 查询 ====================
+
+    def get_path(self, title, artist, duration, kind, verify=False):
+        """
+        缓存文件路径
+        :param kind: "lyrics" / "cover"
+        :param verify: True 时检查文件是否还在；已被外部删除则移除索引记录，返回 None
+        :return: 文件路径，未缓存时返回 None
+        """
+        entry = self.get_entry(title, artist, duration, kind)
+        if entry is None:
+            return None
+        if verify and not os.path.isfile(entry["path"]):
+            print(f"[缓存] 文件已不存在，移除记录: {entry['path']}")
+            self.remove(title, artist, duration, kind)
+            return None
+        return entry["path"]
+
+    def get_entry(self, title, artist, duration, kind):
+        """
+        缓存条目详情
+        :return: {'path', 'bytes', 'format', 'width', 'height'}，未缓存时返回 None；
+                 format / width / height 只有图片才有（旧缓存为 None）
+        """
+        k = (song_key(title, artist, duration), kind)
+        with self._lock:
+            entry = self._index.get(k)
+            if entry is not None:
+                self.hits += 1
+                entry[2] = time.time()
+                self._touched.add(k)
+                return _describe(self.root, entry)
+
+        entry = self._migrate_legacy(k, title, kind)
+        with self._lock:
+            if entry:
+                self.legacy_hits += 1
+            else:
+                self.misses += 1
+        return _describe(self.root, entry) if entry else None
+
+    def read_bytes(self, title, artist, duration, kind):
+        """读取缓存内容，未缓存（或文件已被外部删除）时返回 None"""
+        path = self.get_path(title, artist, duration, kind)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            self._drop((song_key(title, artist, duration), kind))
+            return None
+
+    def read_text(self, title, artist, duration, kind="lyrics"):
+        data = self.read_bytes(title, artist, duration, kind)
+        return data.decode("utf-8") if data is not None else None
+
+    def stats(self):
+        """命中统计和容量"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.legacy_hits
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "legacy_hits": self.legacy_hits,
+                "hit_rate": (self.hits + self.legacy_hits) / lookups if lookups else 0.0,
+                "entries": len(self._index),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+            }
+
+    # ==================== 写入 ====================
+
+    def put_bytes(self, title, artist, duration, kind, data, fmt=None, size=None):
+        """
+        写入缓存（原子替换），超出容量时淘汰最久未访问的条目
+        :param fmt: 图片格式（PIL 的 format，如 "JPEG" / "PNG"），决定文件扩展名
+        :param size: 图片像素尺寸 (w, h)
+        :return: 缓存文件路径
+        """
+        k = (song_key(title, artist, duration), kind)
+        file = self._file_for(k, IMAGE_EXTS.get(fmt))
+        path = os.path.join(self.root, file)
+        _atomic_write(path, data)
+        old = self._add(k, file, len(data), fmt, size)
+        if old and old != file:
+            # 同一首歌换了格式：删除旧扩展名的文件
+            _remove_quietly(os.path.join(self.root, old))
+        return path
+
+    def put_text(self, title, artist, duration, kind, text):
+        return self.put_bytes(title, artist, duration, kind, text.encode("utf-8"))
+
+    def remove(self, title, artist, duration, kind):
+        self._drop((song_key(title, artist, duration), kind))
+
+    def flush(self):
+        """把内存中的访问时间写回索引"""
+        with self._lock:
+            if self._touched:
+                self._flush_atimes()
+                self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+    # ==================== 内部实现 ====================
+
+    def _file_for(self, k, ext=None):
+        digest = hashlib.sha1(f"{k[0]}|{k[1]}".encode("utf-8")).hexdigest()
+        return f"{digest[:2]}/{digest}.{ext or KINDS[k[1]]}"
+
+    def _add(self, k, file, nbytes, fmt=None, size=None):
+        """写入索引，返回被替换条目的文件名（没有时为 None）"""
+        now = time.time()
+        width, height = size if size else (None, None)
+        with self._lock:
+            old = self._index.get(k)
+            if old is not None:
+                self._total -= old[1]
+            self._index[k] = [file, nbytes, now, fmt, width, height]
+            self._total += nbytes
+            self._conn.execute("INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?,?)",
+                               (*k, file, nbytes, now, fmt, width, height))
+            self._touched.discard(k)
+            self._flush_atimes()  # 随本次写入一并提交
+            self._conn.commit()
+            self._evict()
+        return old[0] if old else None
+
+    def _drop(self, k):
+        with self._lock:
+            entry = self._index.pop(k, None)
+            if entry is None:
+                return
+            self._total -= entry[1]
+            self._touched.discard(k)
+            self._conn.execute("DELETE FROM entries WHERE key=? AND kind=?", k)
+            self._conn.commit()
+        _remove_quietly(os.path.join(self.root, entry[0]))
+
+    def _evict(self):
+        """超出容量时按最近访问时间淘汰，淘汰到容量的 90%"""
+        if self._total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        removed = []
+        for k, entry in sorted(self._index.items(), key=_entry_atime):
+            if self._total <= target:
+                break
+            removed.append((k, entry[0]))
+            self._total -= entry[1]
+        for k, _ in removed:
+            del self._index[k]
+            self._touched.discard(k)
+        self._flush_atimes()
+        self._conn.executemany("DELETE FROM entries WHERE key=? AND kind=?", [k for k, _ in removed])
+        self._conn.commit()
+        for _, file in removed:
+            _remove_quietly(os.path.join(self.root, file))
+        print(f"[缓存] 淘汰 {len(removed)} 项，当前 {self._total // 1024} KB")
+
+    def _flush_atimes(self):
+        """写回积累的访问时间（调用方持有锁并负责 commit）"""
+        if not self._touched:
+            return
+        self._conn.executemany("UPDATE entries SET atime=? WHERE key=? AND kind=?",
+                               [(self._index[k][2], *k) for k in self._touched if k in self._index])
+        self._touched.clear()
+
+    def _migrate_legacy(self, k, title, kind):
+        """旧版 sinf/<标题>.<ext> 文件：移入缓存并建立索引（只查打开时扫描到的文件）"""
+        if not self._legacy:
+            return None
+        with self._lock:
+            legacy = self._legacy.pop((safe_filename(title), kind), None)
+        if legacy is None:
+            return None
+        file = self._file_for(k)
+        path = os.path.join(self.root, file)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(legacy, path)
+        except OSError as e:
+            print(f"[缓存] 迁移旧缓存失败 {legacy}: {e}")
+            return None
+        self._add(k, file, os.path.getsize(path))
+        print(f"[缓存] 已迁移旧缓存: {os.path.basename(legacy)}")
+        with self._lock:
+            return self._index.get(k)
+
+
+def _scan_legacy(cache_dir):
+    """扫描旧版缓存文件，返回 {(文件名去掉扩展名, 类型): 路径}"""
+    kinds = {f".{ext}": kind for kind, ext in KINDS.items()}
+    legacy = {}
+    try:
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                name, ext = os.path.splitext(entry.name)
+                if ext in kinds and entry.is_file():
+                    legacy[(name, kinds[ext])] = entry.path
+    except OSError:
+        pass
+    return legacy
+
+
+def _entry_atime(item):
+    return item[1][2]
+
+
+def _describe(root, entry):
+    file, nbytes, _, fmt, width, height = entry
+    return {"path": os.path.join(root, file), "bytes": nbytes,
+            "format": fmt, "width": width, "height": height}
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _atomic_write(path, data):
+    """写入同目录下的临时文件后替换，读者永远看到完整文件"""
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+# ==================== 全局实例 ====================
+
+_store = None
+
+def get_store():
+    """获取全局缓存实例"""
+    global _store
+    if _store is None:
+        _store = CacheStore()
+    return _store
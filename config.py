@@ -15,6 +15,18 @@ LYRIC_FONT_SIZE = 16
 LYRIC_FONT_SIZE_SUB = 13
 LYRIC_SMOOTHING = 0.05  # 滚动平滑度 (0.1-0.2 之间最丝滑)
 LYRIC_REFRESH_RATE = 4 # 刷新率 (约 60 FPS)
+MONITOR_INTERVAL = 500 # 播放进度刷新间隔 (毫秒)，歌词切换单独精确定时
+
+# 封面设置
+THUMB_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 缩略图磁盘缓存容量上限
+BG_SOURCE_SIZE = 256  # 背景模糊使用的源图尺寸（大半径模糊后与原图无差别）
+BG_PLATE_MEMORY_ITEMS = 4  # 内存中保留的模糊背景底图数（每个 封面 + 窗口尺寸 一张）
+BG_PLATE_DISK_ITEMS = 32  # 磁盘上保留的模糊背景底图数（0 为不保存）
+BG_BLUR_QUALITY = "balanced"  # 背景模糊质量："high"（缩小 4 倍模糊）/ "balanced"（8 倍）/ "fast"（16 倍）
+BG_ANIMATION_MODE = "translate"  # 背景动画方式："translate" 移动整张底图（几乎零开销），"crop" 逐帧裁剪
+RENDER_CACHE_ITEMS = 4  # 保留最近几次的 背景 + 封面 渲染结果（在常用窗口尺寸之间切换时直接显示）
+RESIZE_PREVIEW_INTERVAL = 40  # 拖动窗口时低质量预览的最短间隔 (毫秒)
+RESIZE_SETTLE_DELAY = 200  # 窗口尺寸多久不变后完整渲染 (毫秒)
 
 
 # 颜色设置 (补全了缺失的变量)
@@ -22,3 +34,22 @@ COLOR_BG_DEFAULT = "#1a1a1a"
 COLOR_TEXT_WHITE = "#FFFFFF"
 COLOR_TEXT_GRAY = "#DDDDDD"
 COLOR_BTN_HOVER = "#444444"
+
+# 在线获取设置
+RESOLVE_CACHE_TTL = 7 * 24 * 3600  # 歌曲解析结果（搜索 / 详情）缓存有效期（秒）
+MISS_CACHE_TTL = 3 * 24 * 3600  # 确认无歌词 / 封面的记录有效期（秒），过期后重新尝试
+CANDIDATE_CONFIDENT_SCORE = 0.8  # 最佳候选匹配度达到此值时只请求它的歌词
+CANDIDATE_MIN_SCORE = 0.5  # 低于此匹配度的搜索结果视为不是同一首歌
+CANDIDATE_DURATION_TOLERANCE = 10  # 时长相差多少秒时时长得分降为 0
+COVER_FETCH_SIZE = 512  # 在线封面请求的像素尺寸（服务器缩放后返回，大于窗口中的封面显示尺寸即可）
+STORE_MAX_BYTES = 256 * 1024 * 1024  # 在线歌词 / 封面缓存容量上限
+FETCH_WORKERS = 4  # 后台在线获取的线程数
+FETCH_DEBOUNCE = 0.3  # 切歌后等待多久（秒）才发出在线请求，快速切歌时跳过路过的歌曲
+API_FAILURE_THRESHOLD = 3  # API 连续失败几次后暂停请求（熔断）
+API_BACKOFF_BASE = 5  # 熔断后首次重试等待（秒），之后每次失败翻倍
+API_BACKOFF_MAX = 300  # 重试等待上限（秒）
+PREFETCH_DEPTH = 3  # 预取播放列表中接下来的几首
+PREFETCH_CONCURRENCY = 2  # 同时进行的预取数量上限
+PREFETCH_DELAY = 1.5  # 切歌后等待多久（秒）才开始预取
+ENRICH_CONCURRENCY = 4  # 批量补全（enrich.py）同时处理的歌曲数
+DETAIL_BATCH_SIZE = 50  # 批量补全时每次 /song/detail 查询的歌曲数
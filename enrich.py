@@ -0,0 +1,269 @@
+# enrich.py
+"""
+批量补全在线歌词和封面（无界面）
+- 遍历曲库索引、播放列表文件（.m3u / .m3u8 / .txt）或文件夹
+- 索引中没有或已变化的文件先用 scanner.LibraryScanner 多进程解析元数据
+- 三个阶段：并发解析歌曲 → 批量 /song/detail 获取封面地址 → 并发下载歌词和封面
+- 已完成的歌曲记录在检查点文件中，中断后重新运行会跳过它们
+- 结束时输出吞吐量
+
+用法:
+    python enrich.py                      # 曲库中的全部歌曲
+    python enrich.py 列表.m3u8 D:\\Music   # 播放列表文件 / 文件夹
+    python enrich.py --api http://localhost:3000 --workers 8
+    python enrich.py --reset              # 忽略检查点，从头开始
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import config
+import utils
+import library
+import scanner
+import metadata
+import online_fetcher
+from cache_store import song_key
+
+PLAYLIST_EXTS = (".m3u", ".m3u8", ".txt")
+CHECKPOINT_EVERY = 20  # 每完成多少首写一次检查点
+PROGRESS_INTERVAL = 1.0  # 解析元数据时输出进度的最短间隔（秒）
+
+
+def read_playlist_file(path):
+    """读取播放列表文件中的音频路径（相对路径相对于列表所在目录）"""
+    base = os.path.dirname(os.path.abspath(path))
+    files = []
+    with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            files.append(line if os.path.isabs(line) else os.path.join(base, line))
+    return files
+
+
+def collect_paths(sources, lib):
+    """把命令行参数展开为音频文件列表；没有参数时使用整个曲库"""
+    if not sources:
+        return lib.paths()
+    paths = []
+    for src in sources:
+        if os.path.isfile(src) and src.lower().endswith(PLAYLIST_EXTS):
+            paths.extend(scanner.expand_paths(read_playlist_file(src)))
+        else:
+            paths.extend(scanner.expand_paths([src]))
+    return list(dict.fromkeys(paths))  # 去重并保持顺序
+
+
+def load_infos(paths, lib):
+    """
+    读取元数据：索引中没有或已变化的文件先用扫描器并行解析（写回索引），输出进度
+    :return: [TrackInfo, ...]，与 paths 顺序一致
+    """
+    finished = threading.Event()
+    last = [0.0]
+
+    def on_batch(infos, done, total):
+        now = time.time()
+        if done == total or now - last[0] >= PROGRESS_INTERVAL:
+            last[0] = now
+            print(f"[补全] 解析元数据 {done}/{total}")
+
+    scan = scanner.LibraryScanner(lib)
+    scan.scan(paths, on_batch=on_batch, on_done=lambda total: finished.set())
+    try:
+        while not finished.wait(0.5):  # 带超时等待，Ctrl+C 可以中断
+            pass
+    finally:
+        scan.shutdown()
+    # 解析失败的文件索引中没有记录，由 get 退回逐个解析
+    return [lib.get(p, verify=False) for p in paths]
+
+
+class Checkpoint:
+    """已完成歌曲的记录（JSON，原子写入）"""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.done = set(json.load(f).get("done", []))
+            except Exception as e:
+                print(f"[补全] 检查点读取失败，从头开始: {e}")
+
+    def mark(self, key):
+        with self._lock:
+            self.done.add(key)
+            self._unsaved += 1
+            if self._unsaved < CHECKPOINT_EVERY:
+                return
+        self.save()
+
+    def save(self):
+        with self._lock:
+            data = json.dumps({"done": sorted(self.done)}, ensure_ascii=False)
+            self._unsaved = 0
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+    def reset(self):
+        with self._lock:
+            self.done.clear()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Enricher:
+    """批量补全：解析 → 批量详情 → 下载"""
+
+    def __init__(self, fetcher, checkpoint, workers=None, batch_size=None):
+        self.fetcher = fetcher
+        self.checkpoint = checkpoint
+        self.workers = workers or config.ENRICH_CONCURRENCY
+        self.batch_size = batch_size or config.DETAIL_BATCH_SIZE
+        self.stats = {"tracks": 0, "skipped": 0, "lyrics": 0, "covers": 0,
+                      "not_found": 0, "failed": 0, "detail_requests": 0}
+        self._lock = threading.Lock()
+
+    def run(self, infos):
+        start = time.time()
+        todo = []
+        for info in infos:
+            need_lyrics, need_cover = self._needs(info)
+            key = song_key(info.title, info.artist, info.duration)
+            if (not need_lyrics and not need_cover) or key in self.checkpoint.done:
+                self.stats["skipped"] += 1
+                continue
+            todo.append((info, need_lyrics, need_cover, key))
+        print(f"[补全] 共 {len(infos)} 首，需要处理 {len(todo)} 首，跳过 {self.stats['skipped']} 首")
+
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="enrich")
+        try:
+            # 1. 并发解析（搜索结果进入解析缓存）
+            resolved = list(pool.map(self._resolve, todo))
+
+            # 2. 批量获取封面地址，下载封面时不再逐首请求详情
+            covers = [(info.title, info.artist, info.duration, candidates)
+                      for (info, _, need_cover, _), candidates in zip(todo, resolved)
+                      if need_cover and candidates]
+            try:
+                self.stats["detail_requests"] = self.fetcher.fill_pic_urls(covers, self.batch_size)
+            except Exception as e:
+                print(f"[补全] 批量获取详情失败: {e}")
+
+            # 3. 并发下载歌词和封面
+            for _ in pool.map(self._fetch, todo):
+                pass
+        finally:
+            # 中断时丢弃尚未开始的任务，已完成的进度写入检查点
+            pool.shutdown(wait=True, cancel_futures=True)
+            self.checkpoint.save()
+            self._report(time.time() - start)
+
+    def _needs(self, info):
+        """歌曲缺少哪些资源（本地已有的不再获取）"""
+        store = self.fetcher.store
+        need_lyrics = (not info.has_lyrics
+                       and not os.path.exists(metadata.sidecar_lrc_path(info.path))
+                       and store.get_path(info.title, info.artist, info.duration, "lyrics") is None)
+        need_cover = (info.cover is None
+                      and store.get_path(info.title, info.artist, info.duration, "cover") is None)
+        return need_lyrics, need_cover
+
+    def _resolve(self, item):
+        info = item[0]
+        try:
+            return self.fetcher.resolve(info.title, info.artist, info.duration)
+        except Exception as e:
+            print(f"[补全] 解析失败 {info.title}: {e}")
+            return None
+
+    def _fetch(self, item):
+        info, need_lyrics, need_cover, key = item
+        t, a, d = info.title, info.artist, info.duration
+        ok = True
+        found = False
+        try:
+            if need_lyrics:
+                if self.fetcher.fetch_lyrics(t, a, d):
+                    found = True
+                    self._count("lyrics")
+                elif not self.fetcher.misses.is_miss(t, a, "lyrics"):
+                    ok = False  # 不是确认无歌词（网络错误等），下次继续
+            if need_cover:
+                if self.fetcher.fetch_cover(t, a, d):
+                    found = True
+                    self._count("covers")
+                elif not self.fetcher.misses.is_miss(t, a, "cover"):
+                    ok = False
+        except Exception as e:
+            print(f"[补全] 失败 {t}: {e}")
+            ok = False
+
+        self._count("tracks")
+        if not ok:
+            self._count("failed")
+            return
+        if not found:
+            self._count("not_found")
+        self.checkpoint.mark(key)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _report(self, elapsed):
+        s = self.stats
+        rate = s["tracks"] / elapsed if elapsed > 0 else 0.0
+        print("=" * 48)
+        print(f"[补全] 处理 {s['tracks']} 首，用时 {elapsed:.1f} 秒，{rate:.2f} 首/秒")
+        print(f"       歌词 +{s['lyrics']}，封面 +{s['covers']}，无结果 {s['not_found']}，"
+              f"失败 {s['failed']}，跳过 {s['skipped']}")
+        print(f"       批量详情请求 {s['detail_requests']} 次，缓存 {self.fetcher.store.stats()}")
+        if s["failed"]:
+            print(f"       失败的歌曲未记入检查点，重新运行会继续处理")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量补全在线歌词和封面")
+    parser.add_argument("sources", nargs="*", help="播放列表文件或文件夹；不填时处理整个曲库")
+    parser.add_argument("--api", help="API 地址（默认使用 online_fetcher 中的配置）")
+    parser.add_argument("--workers", type=int, default=config.ENRICH_CONCURRENCY, help="并发数")
+    parser.add_argument("--batch", type=int, default=config.DETAIL_BATCH_SIZE, help="每次批量详情查询的歌曲数")
+    parser.add_argument("--checkpoint", default=os.path.join(utils.get_cache_dir(), "enrich.json"),
+                        help="检查点文件")
+    parser.add_argument("--reset", action="store_true", help="忽略检查点，从头开始")
+    args = parser.parse_args(argv)
+
+    lib = library.get_library()
+    paths = collect_paths(args.sources, lib)
+    if not paths:
+        print("[补全] 没有找到音频文件")
+        return 1
+
+    checkpoint = Checkpoint(args.checkpoint)
+    if args.reset:
+        checkpoint.reset()
+    fetcher = online_fetcher.OnlineFetcher(api_url=args.api) if args.api else online_fetcher.get_fetcher()
+    try:
+        # 元数据优先读曲库索引，新文件并行解析后写回
+        infos = load_infos(paths, lib)
+        Enricher(fetcher, checkpoint, args.workers, args.batch).run(infos)
+    except KeyboardInterrupt:
+        print("\n[补全] 已中断，进度已保存")
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
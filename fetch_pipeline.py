@@ -0,0 +1,147 @@
+# fetch_pipeline.py
+"""
+在线获取流水线
+- 在线程池中执行 OnlineFetcher 的网络请求，立即返回 Future
+- 调用方（Tk 主线程）不再阻塞，结果到达后通过回调应用
+- 相同歌曲的相同请求合并：进行中的请求被再次提交时直接返回同一个 Future
+- 播放时的请求先等待一小段时间（防抖），期间已经切到别的歌则直接取消，
+  快速连续切歌只会为最终停下的那首发出请求
+- 预取（后台）请求使用单独的线程池，不占用播放时请求的线程
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+import config
+import online_fetcher
+from cache_store import song_key
+
+
+class FetchPipeline:
+    """后台获取歌词 / 封面"""
+
+    def __init__(self, fetcher=None, max_workers=None, background_workers=None, debounce=None):
+        self.fetcher = fetcher or online_fetcher.get_fetcher()
+        self.debounce = config.FETCH_DEBOUNCE if debounce is None else debounce
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers or config.FETCH_WORKERS,
+            thread_name_prefix="fetch")
+        self._background = ThreadPoolExecutor(
+            max_workers=background_workers or config.PREFETCH_CONCURRENCY,
+            thread_name_prefix="fetch-bg")
+        self._lock = threading.Lock()
+        self._inflight = {}     # (kind, 歌曲键) -> Future
+        self._pinned = set()    # 有后台调用方在等待的请求，不随切歌取消
+        self._active = None     # 当前播放歌曲的键
+        self.coalesced = 0      # 合并的请求数
+        self.cancelled = 0      # 切歌后取消的请求数
+
+    def focus(self, title, artist, duration=None):
+        """
+        切歌时调用：之后只有这首歌的播放请求会真正发出，
+        其他歌曲还在防抖或排队中的播放请求被取消
+        """
+        with self._lock:
+            self._active = song_key(title, artist, duration)
+
+    def submit_lyrics(self, title, artist, duration=None, background=False):
+        """后台获取歌词，Future 结果为 lrc.LyricTimeline"""
+        return self._submit("lyrics", self.fetcher.fetch_lyrics, title, artist, duration, background)
+
+    def submit_cover(self, title, artist, duration=None, background=False):
+        """后台获取封面，Future 结果为 metadata.LazyCover 或 None"""
+        return self._submit("cover", self.fetcher.fetch_cover, title, artist, duration, background)
+
+    def shutdown(self):
+        with self._lock:
+            pending = list(self._inflight.values())
+            self._pinned.clear()
+        for future in pending:
+            future.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._background.shutdown(wait=False, cancel_futures=True)
+
+    # ==================== 内部实现 ====================
+
+    def _submit(self, kind, fn, title, artist, duration, background):
+        """
+        :param background: True 为预取请求（不防抖、不随切歌取消）；
+                           False 为播放请求（防抖，切到别的歌后取消）
+        """
+        key = (kind, song_key(title, artist, duration))
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None and not future.cancelled():
+                self.coalesced += 1
+                if background:
+                    self._pinned.add(key)
+                return future
+            future = Future()
+            self._inflight[key] = future
+            if background:
+                self._pinned.add(key)
+
+        args = (key, future, fn, (title, artist, duration))
+        if background:
+            self._background.submit(self._run, *args)
+        elif self.debounce > 0:
+            timer = threading.Timer(self.debounce, self._start, args)
+            timer.daemon = True
+            timer.start()
+        else:
+            self._start(*args)
+        return future
+
+    def _wanted(self, key):
+        """请求是否仍然需要：后台请求，或当前播放歌曲的请求"""
+        with self._lock:
+            return key in self._pinned or key[1] == self._active
+
+    def _start(self, key, future, fn, args):
+        """防抖结束：仍然需要时交给线程池"""
+        if not self._wanted(key):
+            self._cancel(key, future)
+            return
+        try:
+            self._pool.submit(self._run, key, future, fn, args)
+        except RuntimeError:
+            # 线程池已关闭（退出中）
+            self._cancel(key, future)
+
+    def _run(self, key, future, fn, args):
+        if not self._wanted(key):
+            self._cancel(key, future)
+            return
+        if not future.set_running_or_notify_cancel():
+            self._forget(key, future)
+            return
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            self._forget(key, future)
+
+    def _cancel(self, key, future):
+        if future.cancel():
+            with self._lock:
+                self.cancelled += 1
+        self._forget(key, future)
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+                self._pinned.discard(key)
+
+
+# ==================== 全局实例 ====================
+
+_pipeline = None
+
+def get_pipeline():
+    """获取全局在线获取流水线"""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = FetchPipeline()
+    return _pipeline
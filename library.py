@@ -0,0 +1,181 @@
+# library.py
+"""
+本地曲库索引
+- SQLite 文件保存在 sinf 缓存目录中
+- 以 (路径, mtime, size) 判断文件是否变化，未变化的文件不再重新解析
+- 启动时一次性载入内存，播放列表渲染直接读内存
+"""
+import os
+import sqlite3
+import threading
+import metadata
+import utils
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    path        TEXT PRIMARY KEY,
+    mtime       REAL NOT NULL,
+    size        INTEGER NOT NULL,
+    title       TEXT,
+    artist      TEXT,
+    album       TEXT,
+    duration    REAL,
+    has_lyrics  INTEGER,
+    cover_kind  TEXT,
+    cover_key   TEXT,
+    cover_hash  TEXT
+);
+CREATE TABLE IF NOT EXISTS playlist (
+    pos   INTEGER PRIMARY KEY,
+    path  TEXT NOT NULL
+);
+"""
+
+
+def _file_stamp(path):
+    """返回 (mtime, size)，文件不存在时返回 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime, st.st_size
+
+
+def _info_to_row(info, stamp):
+    kind, key = info.cover if info.cover else (None, None)
+    return (
+        info.path, stamp[0], stamp[1],
+        info.title, info.artist, info.album, info.duration,
+        1 if info.has_lyrics else 0,
+        kind, None if key is None else str(key), info.cover_hash,
+    )
+
+
+def _row_to_info(row):
+    path, _, _, title, artist, album, duration, has_lyrics, kind, key, cover_hash = row
+    cover = None
+    if kind:
+        # flac/covr 的位置是序号，apic 的位置是帧名
+        cover = (kind, key if kind == "apic" else int(key))
+    return metadata.TrackInfo(path, title, artist, album or "", duration or 0,
+                              bool(has_lyrics), cover, cover_hash)
+
+
+class Library:
+    """曲库索引（线程安全）"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(utils.get_cache_dir(), "library.db")
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+        # 内存索引: path -> ((mtime, size), TrackInfo)
+        self._entries = {}
+        for row in self._conn.execute("SELECT * FROM tracks"):
+            self._entries[row[0]] = ((row[1], row[2]), _row_to_info(row))
+        print(f"[曲库] 已载入 {len(self._entries)} 条记录: {self.db_path}")
+
+    # ==================== 查询 ====================
+
+    def get(self, path, verify=True):
+        """
+        获取曲目信息（优先读索引）
+        :param verify: True 时检查 mtime/size，文件变化则重新解析；
+                       False 时只要内存中有记录就直接返回（列表渲染用）
+        :return: TrackInfo
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry and not verify:
+            return entry[1]
+
+        stamp = _file_stamp(path)
+        if entry and (stamp is None or entry[0] == stamp):
+            return entry[1]
+
+        # 新文件或已变化的文件：重新解析并写回索引
+        info = metadata.read_track_info(path)
+        if stamp is not None:
+            self.put(info, stamp)
+        return info
+
+    def lookup(self, path):
+        """只查内存索引，不访问文件系统；没有记录时返回 None"""
+        with self._lock:
+            entry = self._entries.get(path)
+        return entry[1] if entry else None
+
+    def is_fresh(self, path):
+        """索引中的记录是否与磁盘上的文件一致"""
+        with self._lock:
+            entry = self._entries.get(path)
+        return entry is not None and entry[0] == _file_stamp(path)
+
+    def paths(self):
+        """索引中的全部文件路径"""
+        with self._lock:
+            return list(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ==================== 写入 ====================
+
+    def put(self, info, stamp=None):
+        """写入（或覆盖）一条记录"""
+        self.put_many([(info, stamp)])
+
+    def put_many(self, items):
+        """
+        批量写入，一次事务提交
+        :param items: [(TrackInfo, (mtime, size) 或 None), ...]
+        """
+        rows = []
+        with self._lock:
+            for info, stamp in items:
+                stamp = stamp or _file_stamp(info.path)
+                if stamp is None:
+                    continue
+                self._entries[info.path] = (stamp, info)
+                rows.append(_info_to_row(info, stamp))
+            if rows:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO tracks VALUES (?,?,?,?,?,?,?,?,?,?,?)", rows)
+                self._conn.commit()
+
+    # ==================== 播放列表 ====================
+
+    def load_playlist(self):
+        """
+        读取上次保存的播放列表
+        - 不逐个检查文件是否存在（网络盘上启动时会很慢），已删除的文件播放时才处理
+        """
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT path FROM playlist ORDER BY pos")]
+
+    def save_playlist(self, paths):
+        """保存播放列表顺序"""
+        with self._lock:
+            self._conn.execute("DELETE FROM playlist")
+            self._conn.executemany("INSERT INTO playlist VALUES (?, ?)", list(enumerate(paths)))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ==================== 全局实例 ====================
+
+_library = None
+
+def get_library():
+    """获取全局曲库索引实例"""
+    global _library
+    if _library is None:
+        _library = Library()
+    return _library
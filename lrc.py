@@ -0,0 +1,163 @@
+# lrc.py
+"""
+LRC 歌词解析
+- 统一的解析入口，替代各模块里各自的正则
+- 支持 [offset:]、一行多个时间标签、[m:ss] / [mm:ss.x] / [mm:ss.xx] / [mm:ss.xxx] / [mm:ss:xx]
+- 解析结果为不可变的 LyricTimeline：时间点存放在 array('d')，文本存放在平行的元组中
+"""
+import re
+from array import array
+from bisect import bisect_right
+
+# 行首时间标签 + 歌词文本（整段文本一次 findall，避免逐行调用正则）
+# 分组: 第一个标签的 分 / 秒(含 . 小数) / : 分隔的小数，其余时间标签，歌词文本
+_LINE = re.compile(
+    r'^[ \t]*\[(\d{1,3}):(\d{1,2}(?:\.\d{1,3})?)(?::(\d{1,3}))?\][ \t]*'
+    r'((?:\[\d{1,3}:\d{1,2}(?:[.:]\d{1,3})?\][ \t]*)*)(.*)',
+    re.MULTILINE)
+# 单个时间标签（用于同一行的其余标签）
+_STAMP = re.compile(r'(\d{1,3}):(\d{1,2}(?:\.\d{1,3})?)(?::(\d{1,3}))?')
+# 行内的逐字时间标签
+_TIME_TAG = re.compile(r'\[\d{1,3}:\d{1,2}(?:[.:]\d{1,3})?\]')
+# 偏移标签（毫秒），正数表示歌词整体提前
+_OFFSET_TAG = re.compile(r'^[ \t]*\[offset:[ \t]*([+-]?\d+)[ \t]*\]', re.IGNORECASE | re.MULTILINE)
+
+
+class LyricTimeline:
+    """
+    不可变的歌词时间轴
+    - times: array('d')，升序的时间点（秒）
+    - texts: tuple，与 times 一一对应的歌词文本
+    """
+    __slots__ = ("times", "texts")
+
+    def __init__(self, times=None, texts=()):
+        object.__setattr__(self, "times", times if times is not None else array('d'))
+        object.__setattr__(self, "texts", tuple(texts))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("LyricTimeline 不可修改")
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __bool__(self):
+        return bool(self.texts)
+
+    def __eq__(self, other):
+        return (isinstance(other, LyricTimeline)
+                and self.times == other.times and self.texts == other.texts)
+
+    def __hash__(self):
+        return hash((self.times.tobytes(), self.texts))
+
+    def __repr__(self):
+        return f"LyricTimeline({len(self)} lines)"
+
+    def index_at(self, t):
+        """时间 t 时应显示的行号，第一行之前返回 -1"""
+        return bisect_right(self.times, t) - 1
+
+
+EMPTY = LyricTimeline()
+
+
+def parse(lrc_text):
+    """
+    解析 LRC 文本
+    :return: LyricTimeline（无有效歌词时为 EMPTY）
+    """
+    if not lrc_text:
+        return EMPTY
+
+    offset = 0.0
+    m = _OFFSET_TAG.search(lrc_text)
+    if m:
+        offset = int(m.group(1)) / 1000
+
+    entries = []
+    append = entries.append
+    for minutes, seconds, colon_frac, more, text in _LINE.findall(lrc_text):
+        if '[' in text:
+            text = _TIME_TAG.sub('', text)
+        text = text.strip()
+        if not text:
+            continue
+        t = int(minutes) * 60 + float(seconds)
+        if colon_frac:
+            t += float("0." + colon_frac)
+        append((t, text))
+        if more:
+            for minutes, seconds, colon_frac in _STAMP.findall(more):
+                t = int(minutes) * 60 + float(seconds)
+                if colon_frac:
+                    t += float("0." + colon_frac)
+                append((t, text))
+
+    if not entries:
+        return EMPTY
+
+    # 按时间稳定排序；同一时间点保留最后出现的一行
+    entries.sort(key=_entry_time)
+    times = array('d')
+    texts = []
+    last = None
+    for t, text in entries:
+        if offset:
+            t = max(0.0, t - offset)
+        if t == last:
+            texts[-1] = text
+        else:
+            times.append(t)
+            texts.append(text)
+            last = t
+    return LyricTimeline(times, texts)
+
+
+def _entry_time(entry):
+    return entry[0]
+
+
+class LyricCursor:
+    """
+    歌词游标
+    - 正常播放时逐行向前步进（均摊 O(1)）
+    - 拖动进度条或时间倒退时用二分查找重新定位
+    - time_to_next() 给出距离下一行的时间，便于精确调度高亮切换
+    """
+    __slots__ = ("timeline", "index")
+
+    def __init__(self, timeline=EMPTY):
+        self.timeline = timeline
+        self.index = -1
+
+    def seek(self, t):
+        """跳转后重新定位（二分查找）"""
+        self.index = self.timeline.index_at(t)
+        return self.index
+
+    def update(self, t):
+        """
+        根据播放时间更新当前行
+        :return: 当前行号，第一行之前为 -1
+        """
+        times = self.timeline.times
+        i = self.index
+        n = len(times)
+        if i >= 0 and t < times[i]:
+            # 时间倒退
+            return self.seek(t)
+        if i + 1 < n and times[i + 1] <= t:
+            i += 1
+            if i + 1 < n and times[i + 1] <= t:
+                # 一次跨过多行（跳转或卡顿），直接二分
+                return self.seek(t)
+        self.index = i
+        return i
+
+    def time_to_next(self, t):
+        """距离下一行开始的秒数，已经是最后一行时返回 None"""
+        nxt = self.index + 1
+        if nxt >= len(self.timeline.times):
+            return None
+        return max(0.0, self.timeline.times[nxt] - t)
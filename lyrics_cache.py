@@ -0,0 +1,146 @@
+# lyrics_cache.py
+"""
+歌词解析结果缓存
+- 内存 LRU + SQLite 持久化，避免每次播放都重新读取和解析歌词
+- 以 (文件路径, 来源) 为键；来源: embedded（内嵌）/ sidecar（同名 .lrc）/ sinf（在线缓存）
+- 记录歌词所在文件的 mtime/size，文件变化后自动失效
+"""
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+import lrc
+import library
+import metadata
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lyrics (
+    path    TEXT NOT NULL,
+    source  TEXT NOT NULL,
+    mtime   REAL NOT NULL,
+    size    INTEGER NOT NULL,
+    times   BLOB NOT NULL,
+    texts   TEXT NOT NULL,
+    PRIMARY KEY (path, source)
+);
+"""
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime, st.st_size
+
+
+def _encode(timeline):
+    # 歌词文本不含换行，直接用换行拼接
+    return timeline.times.tobytes(), "\n".join(timeline.texts)
+
+
+def _decode(times_blob, texts):
+    if not texts:
+        return lrc.EMPTY
+    times = array('d')
+    times.frombytes(times_blob)
+    return lrc.LyricTimeline(times, texts.split("\n"))
+
+
+def _read_text(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class LyricsCache:
+    """歌词时间轴缓存（线程安全）"""
+
+    def __init__(self, db_path=None, memory_items=32):
+        self.db_path = db_path or library.get_library().db_path
+        self.memory_items = memory_items
+        self._lock = threading.RLock()
+        self._memory = OrderedDict()  # (path, source) -> ((mtime, size), LyricTimeline)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    # ==================== 公开接口 ====================
+
+    def load_local(self, info):
+        """
+        本地歌词：内嵌歌词优先，其次同名 .lrc
+        :param info: metadata.TrackInfo（has_lyrics 为 False 时不再打开音频文件）
+        :return: lrc.LyricTimeline
+        """
+        if info.has_lyrics:
+            timeline = self._cached(info.path, "embedded",
+                                    lambda: metadata.read_embedded_lyrics(info.path))
+            if timeline:
+                return timeline
+
+        lrc_path = metadata.sidecar_lrc_path(info.path)
+        return self._cached(lrc_path, "sidecar", lambda: _read_text(lrc_path))
+
+    def load_file(self, lrc_path, source="sinf"):
+        """读取并解析一个 .lrc 文件（带缓存），文件不存在时返回空时间轴"""
+        return self._cached(lrc_path, source, lambda: _read_text(lrc_path))
+
+    def invalidate(self, path):
+        """删除某个文件的所有缓存"""
+        with self._lock:
+            for key in [k for k in self._memory if k[0] == path]:
+                del self._memory[key]
+            self._conn.execute("DELETE FROM lyrics WHERE path=?", (path,))
+            self._conn.commit()
+
+    # ==================== 内部实现 ====================
+
+    def _cached(self, path, source, read_text):
+        stamp = _stamp(path)
+        if stamp is None:
+            return lrc.EMPTY
+
+        key = (path, source)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] == stamp:
+                self._memory.move_to_end(key)
+                return entry[1]
+
+            row = self._conn.execute(
+                "SELECT mtime, size, times, texts FROM lyrics WHERE path=? AND source=?", key).fetchone()
+        if row and (row[0], row[1]) == stamp:
+            timeline = _decode(row[2], row[3])
+        else:
+            # 未缓存或文件已变化：重新读取解析
+            try:
+                timeline = lrc.parse(read_text())
+            except Exception as e:
+                print(f"[歌词缓存] 读取失败 {path}: {e}")
+                timeline = lrc.EMPTY
+            times_blob, texts = _encode(timeline)
+            with self._lock:
+                self._conn.execute("INSERT OR REPLACE INTO lyrics VALUES (?,?,?,?,?,?)",
+                                   (path, source, stamp[0], stamp[1], times_blob, texts))
+                self._conn.commit()
+
+        with self._lock:
+            self._memory[key] = (stamp, timeline)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+        return timeline
+
+
+# ==================== 全局实例 ====================
+
+_cache = None
+
+def get_lyrics_cache():
+    """获取全局歌词缓存实例"""
+    global _cache
+    if _cache is None:
+        _cache = LyricsCache()
+    return _cache
@@ -2,18 +2,29 @@
 import sys
 import os
 import re
+import queue
+import multiprocessing
 import tkinter as tk
 from tkinter import messagebox, filedialog
 import customtkinter as ctk 
 import pygame
-from PIL import Image, ImageTk
 import math
+from PIL import Image
 import splash
 import config
 import utils
 import metadata
+import lrc
+import lyrics_cache
+import library
+import thumbs
+import background
+import render_worker
+import scanner
 import assets 
-import online_fetcher  # 实验性功能：在线获取歌词和封面 
+import fetch_pipeline  # 实验性功能：后台在线获取歌词和封面 
+import prefetch
+import cache_store
 
 try:
     from tkinterdnd2 import TkinterDnD, DND_FILES
@@ -50,21 +61,35 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
         if os.path.exists(icon_path):
             self.iconbitmap(icon_path)
 
+        # 曲库索引（SQLite），上次的播放列表从索引中恢复
+        self.library = library.get_library()
+
         # State
-        self.playlist = []
+        self.playlist = self.library.load_playlist()
+        self.scanner = scanner.LibraryScanner(self.library)
+        self.scan_pending = set()  # 已加入播放列表但还未解析完成的文件
+        self.scans_running = 0     # 进行中的导入数（多次导入可以同时进行）
+        self.ui_queue = queue.Queue()  # 后台线程 → Tk 主线程的回调队列
         self.current_index = -1  # -1 表示没有当前播放的歌曲
         self.is_playing = False
         self.is_dragging = False
         self.total_duration = 1 
         self.seek_offset = 0
-        self.original_cover = metadata.get_default_cover()
-        self.tiny_cover = self.original_cover.resize((50, 50)) 
-        self.lyrics_map = {}
-        self.time_points = []
+        self.thumbs = thumbs.get_thumbnail_cache()
+        self.background = background.get_background_engine()
+        self.lyrics_cache = lyrics_cache.get_lyrics_cache()
+        self.store = cache_store.get_store()  # 在线获取的歌词 / 封面缓存
+        self.cover_handle = None  # 当前封面句柄（metadata.LazyCover），None 为默认封面
+        self.lyrics = lrc.EMPTY  # 当前歌词时间轴 (lrc.LyricTimeline)
         self.active_lyric_index = -1
-        self.resize_timer = None
-        self.tk_bg_ref = None
-        self.tk_cover_ref = None
+        self.lyric_cursor = lrc.LyricCursor(self.lyrics)  # 当前歌词游标
+        self.lyric_status = None   # 无歌词时显示的状态文字（如"正在获取歌词..."）
+        self.play_token = 0        # 每次切歌递增，用于丢弃过期的后台获取结果
+        self.lyric_timer = None    # 下一行歌词的精确切换定时器
+        self.monitor_timer = None  # 播放进度刷新定时器
+        self.resize_timer = None   # 窗口尺寸稳定后完整渲染的定时器
+        self.preview_timer = None  # 拖动窗口时的预览定时器
+        self.visual_size = None    # 当前画面对应的窗口尺寸
         self.playlist_window = None  # 播放列表窗口（废弃，改用下拉菜单）
         
         # 下拉菜单状态
@@ -82,11 +107,22 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
         self.bg_animation_phase = 0.0  # 动画相位 (0.0 - 4.0)
         self.bg_animation_speed = 0.01  # 动画速度（每帧增加的相位）
         self.bg_animation_timer = None  # 动画定时器
-        self.bg_original_image = None  # 原始背景图（用于动画）
+        self.bg_plate = None  # 当前模糊背景底图（background.Plate）
+        self.rendered = None  # 最近一次完整渲染的结果（render_worker.RenderResult），预览从它缩放
+        self.bg_animation_mode = config.BG_ANIMATION_MODE
         
         # 实验性功能开关
         self.enable_online_fetch = True  # 是否启用在线获取歌词和封面
 
+        # 后续曲目预取（元数据 / 歌词 / 封面 / 缩略图）
+        self.prefetcher = prefetch.Prefetcher(
+            self.library, self.lyrics_cache, self.thumbs,
+            pipeline=fetch_pipeline.get_pipeline() if self.enable_online_fetch else None)
+        if self.enable_online_fetch:
+            # API 不可用时在底部提示，恢复后清除
+            fetch_pipeline.get_pipeline().fetcher.breaker.on_change = \
+                lambda status: self.call_in_ui(self._on_api_status, status)
+
         self.refs = {
             "bg": None, "cover": None, 
             "btn_play": None, "btn_pause": None,
@@ -108,12 +144,19 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
 
         self.id_bg = self.canvas.create_image(0, 0, anchor="nw")
         self.id_cover = self.canvas.create_image(0, 0, anchor="center")
+        # 背景 / 封面在后台线程渲染，主线程只把结果贴进常驻的 PhotoImage
+        self.bg_slot = render_worker.PhotoSlot(self.canvas, self.id_bg)
+        self.cover_slot = render_worker.PhotoSlot(self.canvas, self.id_cover)
+        self.renderer = render_worker.RenderWorker(
+            self.thumbs, self.background, lambda result: self.call_in_ui(self._apply_render, result))
         
         # 文本
         f_main = (utils.REAL_FONT_NAME, BASE_SIZE_MAIN, "bold")
         f_sub = (utils.REAL_FONT_NAME, BASE_SIZE_SUB)
         self.id_title = self.canvas.create_text(0, 0, text="Ready", font=f_main, fill="white", anchor="center")
         self.id_artist = self.canvas.create_text(0, 0, text="Drag & Drop music", font=f_sub, fill="#DDDDDD", anchor="center")
+        self.id_status = self.canvas.create_text(0, 0, text="", font=(utils.REAL_FONT_NAME, 10), fill="#888888", anchor="center")
+        self.status_texts = {}  # 状态来源 (scan / api) -> 文字
         
         # 歌词Canvas - 用于滚动歌词显示
         self.lyric_items = []
@@ -149,8 +192,9 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
 
         # 启动动画循环
         self.animate_lyrics() 
+        self._process_ui_queue()
         
-        self.update_visuals(self.original_cover)
+        self.update_visuals()
         self.monitor()
 
     def load_icon_assets(self):
@@ -289,8 +333,8 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
             empty_label.pack(pady=20)
         else:
             for idx, path in enumerate(self.playlist):
-                # 获取歌曲信息
-                title, artist, _, _ = metadata.get_track_info(path)
+                # 获取歌曲信息（优先读曲库索引，不解码封面）
+                title, artist = self._track_label(path)
                 
                 is_current = (idx == self.current_index)
                 
@@ -361,8 +405,8 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
         # 追加新歌曲
         for i, path in enumerate(new_songs):
             idx = start_index + i
-            # 获取歌曲信息
-            title, artist, _, _ = metadata.get_track_info(path)
+            # 获取歌曲信息（优先读曲库索引，不解码封面）
+            title, artist = self._track_label(path)
             
             is_current = (idx == self.current_index)
             
@@ -402,6 +446,25 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
             )
             delete_btn.pack(side="right", padx=5)
 
+    def _track_label(self, path):
+        """播放列表中显示的 (标题, 艺术家)；正在后台解析的文件先显示文件名"""
+        info = self.library.lookup(path)
+        if info is None and path not in self.scan_pending:
+            info = self.library.get(path, verify=False)
+        if info is None:
+            return os.path.splitext(os.path.basename(path))[0], ""
+        return info.title, info.artist
+
+    def _update_playlist_labels(self, infos):
+        """后台解析完成后，更新播放列表中对应歌曲的显示文字"""
+        if not self.playlist_song_buttons or not infos:
+            return
+        changed = {info.path: info for info in infos}
+        for idx, path in enumerate(self.playlist):
+            info = changed.get(path)
+            if info and idx < len(self.playlist_song_buttons):
+                self.playlist_song_buttons[idx].configure(text=f"{info.title}\n{info.artist}")
+
     def on_playlist_close(self):
         """播放列表窗口关闭时的回调（已废弃）"""
         pass
@@ -445,6 +508,8 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
                 if index < self.current_index:
                     self.current_index -= 1
             
+            self.library.save_playlist(self.playlist)
+
             # 刷新播放列表内容
             if self.dropdown_visible:
                 self.refresh_playlist_content()
@@ -499,38 +564,63 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
         bottom_spacing = 100  # 两个按钮之间的间距
         self.canvas.coords(self.btn_objects["playlist"]["id"], cx - bottom_spacing, bottom_y)
         self.canvas.coords(self.btn_objects["import"]["id"], cx + bottom_spacing, bottom_y)
+        self.canvas.coords(self.id_status, cx, bottom_y)
 
-    def update_visuals(self, new_cover):
-        if new_cover is None:
-            new_cover = self.original_cover
-        else:
-            self.original_cover = new_cover
+    def set_cover(self, cover_handle):
+        """切换当前封面（None 为默认封面）并刷新画面"""
+        self.cover_handle = cover_handle
+        self.update_visuals()
 
+    def update_visuals(self):
         w = self.winfo_width(); h = self.winfo_height()
         if w < 100: w = config.START_WIDTH; h = config.START_HEIGHT
 
-        # 保存原始背景图用于动画
-        self.bg_original_image = new_cover
-        self.bg_animation_phase = 0.0  # 重置动画相位
+        self.visual_size = (w, h)
+
+        # 背景底图和封面在渲染线程中生成，完成后由 _apply_render 显示；
+        # 这个 封面 + 尺寸 最近渲染过时直接显示
+        cover_size = self._cover_size(w, h)
+        cached = self.renderer.cached(self.cover_handle, w, h, cover_size)
+        if cached is not None:
+            self.renderer.cancel()
+            self._show_render(cached)
+        else:
+            self.renderer.request(self.cover_handle, w, h, cover_size)
+        self.update_layout()
+
+    def _apply_render(self, result):
+        """渲染结果到达（Tk 主线程）"""
+        if not self.renderer.is_latest(result.seq) or result.plate is None:
+            return
+        self._show_render(result)
+
+    def _show_render(self, result):
+        """显示渲染结果：贴进常驻的 PhotoImage"""
+        new_cover = self.rendered is None or self.rendered.cover is not result.cover
+        self.rendered = result
+
+        self.bg_plate = result.plate
+        if new_cover:
+            self.bg_animation_phase = 0.0  # 换封面时重置动画相位，只是尺寸变化时继续
         
-        # 背景（初始位置）
-        bg_img = utils.process_background(new_cover, w, h, 0, 0)
-        self.tk_bg_ref = ImageTk.PhotoImage(bg_img)
-        self.canvas.itemconfig(self.id_bg, image=self.tk_bg_ref)
+        # 背景；平移模式下整张底图只贴一次
+        if self.bg_animation_mode == "translate":
+            self.bg_slot.show(self.bg_plate.image)
+        self._show_background_frame(*background.phase_offset(self.bg_animation_phase))
         
         # 如果正在播放，启动背景动画
         if self.is_playing:
             self.start_background_animation()
 
         # 封面
-        max_size = int(w * config.WIDTH_RATIO)
-        max_h = int(h * config.ALBUM_HEIGHT_RATIO)
-        size = min(max_size, max_h)
-        cover_resized = new_cover.resize((size, size), Image.Resampling.LANCZOS)
-        self.tk_cover_ref = ImageTk.PhotoImage(cover_resized)
-        self.canvas.itemconfig(self.id_cover, image=self.tk_cover_ref)
+        self.cover_slot.show(result.cover_image)
 
-        self.update_layout()
+    def _cover_size(self, w=None, h=None):
+        """当前窗口下的封面显示尺寸"""
+        if w is None:
+            w = self.winfo_width(); h = self.winfo_height()
+            if w < 100: w = config.START_WIDTH; h = config.START_HEIGHT
+        return min(int(w * config.WIDTH_RATIO), int(h * config.ALBUM_HEIGHT_RATIO))
 
     def draw_lyrics_on_canvas(self):
         """在主Canvas上绘制歌词（Apple Music风格）"""
@@ -543,12 +633,17 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
         if w < 100: w = config.START_WIDTH; h = config.START_HEIGHT
         cx = w / 2
 
-        if not self.time_points:
-            # 无歌词时显示音符
-            lrc_y = h * 0.60
+        if not self.lyrics:
+            # 无歌词时显示音符，后台获取中显示提示文字
+            if self.lyric_status:
+                lrc_y = h * 0.63
+                text, font = self.lyric_status, (utils.REAL_FONT_NAME, 12)
+            else:
+                lrc_y = h * 0.60
+                text, font = "♪", (utils.REAL_FONT_NAME, 20)
             item_id = self.canvas.create_text(
-                cx, lrc_y, text="♪",
-                font=(utils.REAL_FONT_NAME, 20),
+                cx, lrc_y, text=text,
+                font=font,
                 fill="#888888", anchor="center"
             )
             self.lyric_items.append(item_id)
@@ -560,9 +655,8 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
         # 显示5行以实现平滑过渡：上上行、上一行、当前行、下一行、下下行
         for offset in [-2, -1, 0, 1, 2]:
             idx = self.active_lyric_index + offset
-            if 0 <= idx < len(self.time_points):
-                t = self.time_points[idx]
-                text = self.lyrics_map[t]
+            if 0 <= idx < len(self.lyrics):
+                text = self.lyrics.texts[idx]
 
                 # Y坐标 = 中心 + 相对偏移 + 滚动动画偏移
                 y_pos = lrc_center_y + (offset * config.LYRIC_LINE_HEIGHT) + self.lyric_scroll_offset
@@ -599,13 +693,57 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
 
     def on_resize(self, event):
         if event.widget == self:
+            if (event.width, event.height) == self.visual_size:
+                return  # 只是移动了窗口
+
+            # 拖动中：节流显示低质量预览；尺寸稳定后再完整渲染
+            if self.preview_timer is None:
+                self.preview_timer = self.after(config.RESIZE_PREVIEW_INTERVAL, self._show_resize_preview)
             if self.resize_timer: self.after_cancel(self.resize_timer)
-            self.resize_timer = self.after(50, lambda: self.update_visuals(None))
+            self.resize_timer = self.after(config.RESIZE_SETTLE_DELAY, self._on_resize_settled)
             
             # 如果下拉菜单是打开的，重新计算目标高度
             if self.dropdown_visible:
                 self.after(60, self.update_dropdown_height)
     
+    def _on_resize_settled(self):
+        self.resize_timer = None
+        if self.preview_timer is not None:
+            self.after_cancel(self.preview_timer)
+            self.preview_timer = None
+        self.update_visuals()
+
+    def _show_resize_preview(self):
+        """
+        拖动窗口时的快速预览：把最近一次完整渲染的背景和封面按最近邻缩放到新尺寸，
+        这个尺寸最近渲染过时直接显示缓存结果
+        """
+        self.preview_timer = None
+        w = self.winfo_width(); h = self.winfo_height()
+        if w < 100 or (w, h) == self.visual_size:
+            return
+        cover_size = self._cover_size(w, h)
+        cached = self.renderer.cached(self.cover_handle, w, h, cover_size)
+        if cached is not None or self.rendered is None or self.rendered.cover is not self.cover_handle:
+            self.update_visuals()
+            return
+        self.visual_size = (w, h)
+        self.renderer.cancel()  # 之前尺寸的渲染结果不再需要
+
+        # 背景：等比放大到能覆盖新窗口
+        plate = self.rendered.plate
+        scale = max(w / plate.win_w, h / plate.win_h)
+        image = plate.image.resize((math.ceil(plate.image.width * scale), math.ceil(plate.image.height * scale)),
+                                   Image.Resampling.NEAREST)
+        self.bg_plate = background.Plate(image, w, h)
+        if self.bg_animation_mode == "translate":
+            self.bg_slot.show(image)
+        self._show_background_frame(*background.phase_offset(self.bg_animation_phase))
+
+        # 封面
+        self.cover_slot.show(self.rendered.cover_image.resize((cover_size, cover_size), Image.Resampling.NEAREST))
+        self.update_layout()
+
     def update_dropdown_height(self):
         """更新下拉菜单的目标高度"""
         w = self.winfo_width()
@@ -642,6 +780,9 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
                 self.seek_offset = target
                 self.is_playing = True
                 self.canvas.itemconfig(self.btn_objects["play"]["id"], image=self.refs["btn_pause"])
+                # 跳转后用二分查找重新定位歌词
+                self.lyric_cursor.seek(target)
+                self.update_lyric(target)
             except: pass
         self.is_dragging = False
 
@@ -658,106 +799,151 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
         else:
             for p in re.findall(r'\{.*?\}|\S+', raw):
                 if os.path.exists(p.strip('{}')): valid.append(p.strip('{}'))
-        valid = [f for f in valid if f.lower().endswith(('.mp3', '.wav', '.flac', '.m4a'))]
+        # 支持拖入文件夹（递归导入其中的音频文件）
+        valid = [f for f in valid if os.path.isdir(f) or scanner.is_audio_file(f)]
         if valid:
-            # 将新文件添加到播放列表末尾
-            new_count = len(valid)
-            start_index = len(self.playlist)  # 记录添加前的位置
-            self.playlist.extend(valid)
-            # 如果当前没有播放或播放列表只有新添加的歌曲，则播放第一首
-            if self.current_index == -1 or len(self.playlist) == new_count:
-                self.current_index = 0
-                self.play_index(0)
-            
-            # 如果下拉菜单是打开的，只追加新歌曲
-            if self.dropdown_visible:
-                self.append_songs_to_playlist(valid, start_index)
+            self.import_paths(valid)
 
     def load_files(self):
         files = filedialog.askopenfilenames(filetypes=[("Audio", "*.mp3 *.wav *.flac *.m4a")])
         if files:
-            files_list = list(files)
-            new_count = len(files_list)
-            start_index = len(self.playlist)  # 记录添加前的位置
-            # 将新文件添加到播放列表末尾
-            self.playlist.extend(files_list)
-            # 如果当前没有播放或播放列表只有新添加的歌曲，则播放第一首
-            if self.current_index == -1 or len(self.playlist) == new_count:
-                self.current_index = 0
-                self.play_index(0)
-            
-            # 如果下拉菜单是打开的，只追加新歌曲
-            if self.dropdown_visible:
-                self.append_songs_to_playlist(files_list, start_index)
+            self.import_paths(list(files))
+
+    def import_paths(self, paths):
+        """导入文件/文件夹：后台展开并用进程池并行解析元数据"""
+        self.set_status("scan", "正在导入...")
+        self.scans_running += 1
+        scan_files = []  # 本次导入展开的文件，完成时只清除这些文件的待解析标记
+
+        def on_files(files):
+            scan_files.extend(files)
+            self.call_in_ui(self._on_scan_files, files)
+
+        self.scanner.scan(
+            paths,
+            on_files=on_files,
+            on_batch=lambda infos, done, total: self.call_in_ui(self._on_scan_batch, infos, done, total),
+            on_done=lambda total: self.call_in_ui(self._on_scan_done, total, scan_files),
+        )
+
+    def _on_scan_files(self, files):
+        """扫描器展开文件列表后：先加入播放列表，元数据稍后分批补齐"""
+        if not files:
+            return
+        start_index = len(self.playlist)  # 记录添加前的位置
+        self.scan_pending.update(f for f in files if self.library.lookup(f) is None)
+        # 将新文件添加到播放列表末尾
+        self.playlist.extend(files)
+        self.library.save_playlist(self.playlist)
+        # 当前没有加载歌曲（含重启后恢复的播放列表）时，从新添加的第一首开始播放
+        if self.current_index == -1:
+            self.play_index(start_index)
+
+        # 如果下拉菜单是打开的，只追加新歌曲
+        if self.dropdown_visible:
+            self.append_songs_to_playlist(files, start_index)
+
+    def _on_scan_batch(self, infos, done, total):
+        self.set_status("scan", f"正在导入 {done}/{total}")
+        for info in infos:
+            self.scan_pending.discard(info.path)
+        if self.dropdown_visible:
+            self._update_playlist_labels(infos)
+
+    def _on_scan_done(self, total, files):
+        self.scan_pending.difference_update(files)
+        self.scans_running -= 1
+        if not self.scans_running:
+            self.set_status("scan", "")
+        if total:
+            print(f"[扫描] ✓ 导入完成，共解析 {total} 首")
+
+    def set_status(self, source, text):
+        """设置底部状态文字；导入进度优先于在线服务状态显示"""
+        self.status_texts[source] = text
+        shown = self.status_texts.get("scan") or self.status_texts.get("api") or ""
+        self.canvas.itemconfig(self.id_status, text=shown)
+
+    def _on_api_status(self, status):
+        """在线获取 API 状态变化（熔断打开 / 恢复）"""
+        if status["state"] == "closed":
+            self.set_status("api", "")
+        else:
+            self.set_status("api", "在线服务暂不可用")
+
+    def call_in_ui(self, fn, *args):
+        """后台线程调用：把回调交给 Tk 主线程执行"""
+        self.ui_queue.put((fn, args))
+
+    def _process_ui_queue(self):
+        """在 Tk 主线程中执行后台线程投递的回调"""
+        while True:
+            try:
+                fn, args = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"[界面] 回调执行失败: {e}")
+        self.after(30, self._process_ui_queue)
 
     def play_index(self, index):
         if not self.playlist: return
         try: pygame.mixer.music.unload()
         except: pass
         self.current_index = index
+        self.play_token += 1  # 切歌后，之前发起的在线获取结果作废
         path = self.playlist[index]
         
-        t, a, d, c = metadata.get_track_info(path)
+        info = self.library.get(path)
+        # 封面句柄（延迟解码，实际像素由缩略图缓存按尺寸提供）
+        embedded_cover = metadata.open_cover(info)
+        t, a, d = info.title, info.artist, info.duration
         self.canvas.itemconfig(self.id_title, text=t)
         self.canvas.itemconfig(self.id_artist, text=a)
         
         self.total_duration = d
         self.seek_offset = 0
+        self.lyric_status = None
+        if self.enable_online_fetch:
+            # 快速切歌时，之前几首还没发出的在线请求全部取消
+            fetch_pipeline.get_pipeline().focus(t, a, d)
         
         # ===== 歌词获取策略（优先级从高到低） =====
-        # 1. 首先尝试从文件内嵌歌词获取
-        self.lyrics_map, self.time_points = metadata.get_lyrics(path)
+        # 1. 首先尝试从文件内嵌歌词 / 同名 .lrc 获取（解析结果有缓存）
+        lyrics = self.lyrics_cache.load_local(info)
         
-        # 2. 如果没有内嵌歌词，检查本地 sinf 文件夹缓存
-        if not self.lyrics_map and self.enable_online_fetch:
-            cached_lyrics, cached_times = self._load_lyrics_from_sinf(t)
+        # 2. 如果没有内嵌歌词，检查本地在线资源缓存
+        if not lyrics and self.enable_online_fetch:
+            cached_lyrics = self._load_cached_lyrics(info)
             if cached_lyrics:
-                self.lyrics_map = cached_lyrics
-                self.time_points = cached_times
-                print(f"[本地缓存] ✓ 使用本地歌词: {t}.lrc")
+                lyrics = cached_lyrics
+                print(f"[本地缓存] ✓ 使用本地歌词: {t} - {a}")
             else:
-                # 显示 loading 提示
-                self._show_loading_text("正在获取歌词...")
-                
-                # 3. 如果缓存也没有，尝试在线获取
-                print(f"[实验性功能] 歌曲无内嵌歌词且无本地缓存，尝试在线获取...")
-                try:
-                    online_lyrics, online_times = online_fetcher.fetch_lyrics_online(t, a)
-                    if online_lyrics:
-                        self.lyrics_map = online_lyrics
-                        self.time_points = online_times
-                except Exception as e:
-                    print(f"[实验性功能] 在线获取歌词失败: {e}")
+                # 3. 如果缓存也没有，后台在线获取，不阻塞界面和播放
+                print(f"[实验性功能] 歌曲无内嵌歌词且无本地缓存，后台在线获取...")
+                self.lyric_status = "正在获取歌词..."
+                future = fetch_pipeline.get_pipeline().submit_lyrics(t, a, d)
+                self._when_done(future, self._apply_online_lyrics)
         
-        self.active_lyric_index = -1
-
-        # 重置滚动位置
-        self.lyric_scroll_offset = 0
-        self.target_scroll_offset = 0
-        self.draw_lyrics_on_canvas()
+        self.set_lyrics(lyrics)
         
         # ===== 封面获取策略（优先级从高到低） =====
-        cover_to_use = c
-        # 1. 如果没有内嵌封面，检查本地 sinf 文件夹缓存
-        if self.enable_online_fetch and c == metadata.get_default_cover():
-            cached_cover = self._load_cover_from_sinf(t)
+        cover_to_use = embedded_cover
+        # 1. 如果没有内嵌封面，检查本地在线资源缓存
+        if self.enable_online_fetch and embedded_cover is None:
+            cached_cover = self._load_cached_cover(info)
             if cached_cover:
                 cover_to_use = cached_cover
-                print(f"[本地缓存] ✓ 使用本地封面: {t}.jpg")
+                print(f"[本地缓存] ✓ 使用本地封面: {t} - {a}")
             else:
-                # 显示 loading 提示
-                self._show_loading_text("正在获取封面...")
-                
-                # 2. 如果缓存也没有，尝试在线获取
-                print(f"[实验性功能] 歌曲无内嵌封面且无本地缓存，尝试在线获取...")
-                try:
-                    online_cover = online_fetcher.fetch_cover_online(t, a)
-                    if online_cover:
-                        cover_to_use = online_cover
-                except Exception as e:
-                    print(f"[实验性功能] 在线获取封面失败: {e}")
+                # 2. 如果缓存也没有，后台在线获取，先显示默认封面
+                print(f"[实验性功能] 歌曲无内嵌封面且无本地缓存，后台在线获取...")
+                future = fetch_pipeline.get_pipeline().submit_cover(t, a, d)
+                self._when_done(future, self._apply_online_cover)
 
-        self.update_visuals(cover_to_use)
+        self.set_cover(cover_to_use)
 
         try:
             pygame.mixer.music.load(path)
@@ -765,134 +951,102 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
             self.is_playing = True
             self.canvas.itemconfig(self.btn_objects["play"]["id"], image=self.refs["btn_pause"])
             self.monitor()
-        except: pass
-    
-    def _show_loading_text(self, message):
-        """在歌词位置显示loading提示"""
-        # 清除旧的歌词显示
-        for item_id in self.lyric_items:
-            self.canvas.delete(item_id)
-        self.lyric_items = []
-        
-        # 显示loading文本
-        w = self.winfo_width()
-        h = self.winfo_height()
-        if w < 100:
-            w = config.START_WIDTH
-            h = config.START_HEIGHT
-        cx = w / 2
-        lrc_y = h * 0.63
-        
-        item_id = self.canvas.create_text(
-            cx, lrc_y,
-            text=message,
-            font=(utils.REAL_FONT_NAME, 12),
-            fill="#888888",
-            anchor="center"
-        )
-        self.lyric_items.append(item_id)
-        
-        # 强制更新画布
-        self.canvas.update()
+        except Exception as e:
+            # 恢复的播放列表不检查文件是否存在，已删除 / 移动的文件在这里发现
+            print(f"[播放] 无法播放 {path}: {e}")
+            self.is_playing = False
+            self.canvas.itemconfig(self.btn_objects["play"]["id"], image=self.refs["btn_play"])
+
+        # 当前歌曲开始播放后，后台预热接下来几首
+        self.prefetcher.schedule(self.playlist, index, self._cover_size())
+
+    def set_lyrics(self, lyrics):
+        """切换当前歌词时间轴，重置游标和滚动位置"""
+        self.lyrics = lyrics
+        self.active_lyric_index = -1
+        self.lyric_cursor = lrc.LyricCursor(self.lyrics)
+        self._cancel_lyric_timer()
+
+        # 重置滚动位置
+        self.lyric_scroll_offset = 0
+        self.target_scroll_offset = 0
+        self.draw_lyrics_on_canvas()
+
+    def _when_done(self, future, apply):
+        """
+        后台任务完成后在 Tk 主线程中调用 apply(result)
+        期间已经切歌时结果直接丢弃
+        """
+        token = self.play_token
+
+        def done(f):
+            if f.cancelled():
+                return
+            try:
+                result = f.result()
+            except Exception as e:
+                print(f"[实验性功能] 在线获取失败: {e}")
+                result = None
+            self.call_in_ui(self._apply_if_current, token, apply, result)
+
+        future.add_done_callback(done)
+
+    def _apply_if_current(self, token, apply, result):
+        if token == self.play_token:
+            apply(result)
+
+    def _apply_online_lyrics(self, lyrics):
+        self.lyric_status = None
+        if lyrics:
+            self.set_lyrics(lyrics)
+            if self.is_playing:
+                self.update_lyric(self._playback_position())
+        else:
+            self.draw_lyrics_on_canvas()
+
+    def _apply_online_cover(self, cover):
+        if cover is None:
+            return
+        # 在线获取的封面是 LazyCover，缩略图缓存按显示尺寸解码
+        self.set_cover(cover)
     
-    def _load_lyrics_from_sinf(self, title):
+    def _load_cached_lyrics(self, info):
         """
-        从 sinf 文件夹加载歌词缓存
-        :param title: 歌曲标题
-        :return: (lyrics_map, time_points) 或 ({}, [])
+        从在线资源缓存加载歌词（解析结果由歌词缓存复用）
+        :return: lrc.LyricTimeline（没有缓存时为空）
         """
         try:
-            # 创建安全的文件名
-            safe_title = self._get_safe_filename(title)
-            # 兼容脚本运行和EXE运行
-            if getattr(sys, 'frozen', False):
-                script_dir = os.path.dirname(sys.executable)
-            else:
-                script_dir = os.path.dirname(os.path.abspath(__file__))
-            sinf_dir = os.path.join(script_dir, "sinf")
-            lrc_path = os.path.join(sinf_dir, f"{safe_title}.lrc")
-            
-            if os.path.exists(lrc_path):
-                # 导入必要的解析函数
-                import re
-                
-                with open(lrc_path, 'r', encoding='utf-8') as f:
-                    lrc_text = f.read()
-                
-                # 解析 LRC 格式
-                lyrics_map = {}
-                time_points = []
-                pattern = r'\[(\d{2}):(\d{2})\.(\d{2,3})\](.*)'
-                
-                for line in lrc_text.split('\n'):
-                    match = re.match(pattern, line)
-                    if match:
-                        minutes = int(match.group(1))
-                        seconds = int(match.group(2))
-                        milliseconds = int(match.group(3))
-                        text = match.group(4).strip()
-                        
-                        time_in_seconds = minutes * 60 + seconds + milliseconds / 1000
-                        
-                        if text:
-                            lyrics_map[time_in_seconds] = text
-                            time_points.append(time_in_seconds)
-                
-                time_points.sort()
-                return lyrics_map, time_points
-            
-            return {}, []
+            lrc_path = self.store.get_path(info.title, info.artist, info.duration, "lyrics")
+            if lrc_path is None:
+                return lrc.EMPTY
+            return self.lyrics_cache.load_file(lrc_path)
         except Exception as e:
             print(f"[本地缓存] 加载歌词失败: {e}")
-            return {}, []
+            return lrc.EMPTY
     
-    def _load_cover_from_sinf(self, title):
+    def _load_cached_cover(self, info):
         """
-        从 sinf 文件夹加载封面缓存
-        :param title: 歌曲标题
-        :return: PIL Image 对象或 None
+        从在线资源缓存加载封面
+        :return: metadata.LazyCover 或 None
         """
         try:
-            # 创建安全的文件名
-            safe_title = self._get_safe_filename(title)
-            # 兼容脚本运行和EXE运行
-            if getattr(sys, 'frozen', False):
-                script_dir = os.path.dirname(sys.executable)
-            else:
-                script_dir = os.path.dirname(os.path.abspath(__file__))
-            sinf_dir = os.path.join(script_dir, "sinf")
-            jpg_path = os.path.join(sinf_dir, f"{safe_title}.jpg")
-            
-            if os.path.exists(jpg_path):
-                from PIL import Image
-                cover_image = Image.open(jpg_path)
-                return cover_image
-            
-            return None
+            jpg_path = self.store.get_path(info.title, info.artist, info.duration, "cover", verify=True)
+            if jpg_path is None:
+                return None
+            return metadata.LazyCover.from_file(jpg_path)
         except Exception as e:
             print(f"[本地缓存] 加载封面失败: {e}")
             return None
-    
-    def _get_safe_filename(self, title):
-        """
-        生成安全的文件名（移除不合法字符）
-        :param title: 歌曲标题
-        :return: 安全的文件名
-        """
-        # 移除文件名中不允许的字符
-        invalid_chars = '<>:"/\\|?*'
-        safe_name = title
-        for char in invalid_chars:
-            safe_name = safe_name.replace(char, '_')
-        # 限制文件名长度
-        if len(safe_name) > 200:
-            safe_name = safe_name[:200]
-        return safe_name
 
     def toggle_play(self):
         if not self.playlist: return
+        if self.current_index == -1:
+            # 重启后恢复了播放列表但还没有加载歌曲，从第一首开始播放
+            self.play_index(0)
+            return
         if self.is_playing:
             pygame.mixer.music.pause(); self.is_playing = False; self.canvas.itemconfig(self.btn_objects["play"]["id"], image=self.refs["btn_play"])
+            self._cancel_lyric_timer()
             self.stop_background_animation()  # 暂停时停止动画
         else:
             pygame.mixer.music.unpause(); self.is_playing = True; self.canvas.itemconfig(self.btn_objects["play"]["id"], image=self.refs["btn_pause"])
@@ -900,7 +1054,7 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
     
     def start_background_animation(self):
         """启动背景动画"""
-        if self.bg_animation_timer is None and self.bg_original_image is not None:
+        if self.bg_animation_timer is None and self.bg_plate is not None:
             self._animate_background()
     
     def stop_background_animation(self):
@@ -911,7 +1065,7 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
     
     def _animate_background(self):
         """背景动画循环 - Apple Music风格"""
-        if not self.is_playing or self.bg_original_image is None:
+        if not self.is_playing or self.bg_plate is None:
             self.bg_animation_timer = None
             return
         
@@ -921,46 +1075,27 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
             self.bg_animation_phase = 0.0  # 循环
         
         # 计算当前偏移量（循环：下 → 右 → 上 → 左）
-        phase = self.bg_animation_phase
-        offset_x = 0
-        offset_y = 0
-        
-        if phase < 1.0:
-            # 阶段1: 向下移动
-            offset_y = phase  # 0.0 → 1.0
-        elif phase < 2.0:
-            # 阶段2: 向右移动
-            offset_y = 1.0
-            offset_x = phase - 1.0  # 0.0 → 1.0
-        elif phase < 3.0:
-            # 阶段3: 向上移动
-            offset_x = 1.0
-            offset_y = 1.0 - (phase - 2.0)  # 1.0 → 0.0
-        else:
-            # 阶段4: 向左移动
-            offset_y = 0.0
-            offset_x = 1.0 - (phase - 3.0)  # 1.0 → 0.0
+        offset_x, offset_y = background.phase_offset(self.bg_animation_phase)
         
-        # 转换为 -1.0 到 1.0 的范围（中心为0）
-        offset_x = (offset_x - 0.5) * 2  # 0→1 变成 -1→1
-        offset_y = (offset_y - 0.5) * 2
-        
-        # 更新背景
-        w = self.winfo_width()
-        h = self.winfo_height()
-        if w > 100:  # 窗口已初始化
-            bg_img = utils.process_background(
-                self.bg_original_image, 
-                w, h, 
-                offset_x, 
-                offset_y
-            )
-            self.tk_bg_ref = ImageTk.PhotoImage(bg_img)
-            self.canvas.itemconfig(self.id_bg, image=self.tk_bg_ref)
+        # 窗口尺寸变化后等 update_visuals 换上新底图
+        if self.bg_plate.fits(self.winfo_width(), self.winfo_height()):
+            self._show_background_frame(offset_x, offset_y)
         
         # 继续动画（约60fps）
         self.bg_animation_timer = self.after(16, self._animate_background)
 
+    def _show_background_frame(self, offset_x, offset_y):
+        """
+        显示背景的一帧
+        - translate: 移动整张底图所在的 Canvas 对象（不做图像处理，不创建 PhotoImage）
+        - crop: 从底图裁剪出窗口大小的一帧，贴进常驻的 PhotoImage
+        """
+        if self.bg_animation_mode == "translate":
+            left, top = self.bg_plate.origin(offset_x, offset_y)
+            self.canvas.coords(self.id_bg, -left, -top)
+        else:
+            self.bg_slot.show(self.bg_plate.frame(offset_x, offset_y))
+
     def prev_song(self):
         if self.playlist:
             old_index = self.current_index
@@ -979,14 +1114,53 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
             if self.dropdown_visible:
                 self.update_playlist_highlight(old_index, new_index)
 
+    def _playback_position(self):
+        """当前播放位置（秒）"""
+        raw = pygame.mixer.music.get_pos()
+        if raw == -1: raw = 0
+        curr = (raw / 1000) + self.seek_offset
+        if curr < 0: curr = 0
+        if curr > self.total_duration: curr = self.total_duration
+        return curr
+
+    def update_lyric(self, curr):
+        """根据播放位置切换高亮歌词，并在下一行开始时精确触发下一次切换"""
+        self._cancel_lyric_timer()
+        if not self.lyrics:
+            return
+
+        new_idx = self.lyric_cursor.update(curr)
+        if new_idx != -1 and new_idx != self.active_lyric_index:
+            self.active_lyric_index = new_idx
+            # 核心：更新目标滚动位置 = 当前索引 * 行高
+            self.lyric_scroll_offset = config.LYRIC_LINE_HEIGHT
+            self.target_scroll_offset = 0
+
+        # 下一行在下次进度刷新之前到来时，单独定时切换
+        wait = self.lyric_cursor.time_to_next(curr)
+        if wait is not None and wait * 1000 < config.MONITOR_INTERVAL and self.is_playing:
+            self.lyric_timer = self.after(max(1, int(wait * 1000)), self._on_lyric_due)
+
+    def _on_lyric_due(self):
+        self.lyric_timer = None
+        if self.is_playing and not self.is_dragging:
+            try: self.update_lyric(self._playback_position())
+            except: pass
+
+    def _cancel_lyric_timer(self):
+        if self.lyric_timer is not None:
+            self.after_cancel(self.lyric_timer)
+            self.lyric_timer = None
+
     def monitor(self):
+        # play_index 会重新调用 monitor，先取消已排队的一次，保证只有一个刷新循环
+        if self.monitor_timer is not None:
+            self.after_cancel(self.monitor_timer)
+            self.monitor_timer = None
+
         if self.is_playing and not self.is_dragging:
             try:
-                raw = pygame.mixer.music.get_pos()
-                if raw == -1: raw = 0
-                curr = (raw / 1000) + self.seek_offset
-                if curr < 0: curr = 0
-                if curr > self.total_duration: curr = self.total_duration
+                curr = self._playback_position()
                 
                 if self.total_duration > 0:
                     ratio = curr / self.total_duration
@@ -999,24 +1173,17 @@ class MusicPlayer(ctk.CTk, TkinterDnD.DnDWrapper):
                 self.canvas.itemconfig(self.id_time_total, text=f"-{utils.fmt_time(rem)}")
                 
                 # 更新歌词
-                if self.time_points:
-                    new_idx = -1
-                    for i, t in enumerate(self.time_points):
-                        if t <= curr: new_idx = i
-                        else: break
-
-                    if new_idx != -1 and new_idx != self.active_lyric_index:
-                        self.active_lyric_index = new_idx
-                        # 核心：更新目标滚动位置 = 当前索引 * 行高
-                        self.lyric_scroll_offset = config.LYRIC_LINE_HEIGHT
-                        self.target_scroll_offset = 0
+                self.update_lyric(curr)
 
                 if not pygame.mixer.music.get_busy() and (self.total_duration - curr) < 1:
                     self.next_song()
             except: pass
-        self.after(500, self.monitor)
+        self.monitor_timer = self.after(config.MONITOR_INTERVAL, self.monitor)
 
 if __name__ == "__main__":
+    # 打包为 EXE 后进程池需要
+    multiprocessing.freeze_support()
+
     # 显示开屏页面
     splash_screen = splash.SplashScreen()
     splash_screen.show()
@@ -1024,3 +1191,10 @@ if __name__ == "__main__":
     # 启动主应用
     app = MusicPlayer()
     app.mainloop()
+    app.renderer.shutdown()
+    app.scanner.shutdown()
+    app.prefetcher.shutdown()
+    fetch_pipeline.get_pipeline().shutdown()
+    # 写回缓存访问时间（后台线程可能还在收尾，只写回不关闭连接）
+    app.store.flush()
+    app.thumbs.flush()
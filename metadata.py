@@ -1,142 +1,349 @@
 # metadata.py
 import os
 import io
-import re
+import hashlib
+from collections import namedtuple
 from PIL import Image
-from mutagen.mp3 import MP3, EasyMP3 
-from mutagen.flac import FLAC
-from mutagen.mp4 import MP4
-from mutagen.id3 import ID3, APIC
+from mutagen.mp4 import MP4Tags
+from mutagen.id3 import ID3
 from mutagen import File as MutagenFile
+import probe
+import lrc
 
 try:
     from tinytag import TinyTag
 except ImportError:
     TinyTag = None
 
+_default_cover = None
+
 def get_default_cover():
-    return Image.new('RGB', (800, 800), color='#222222')
+    """默认封面（全局共享一张，调用方不要原地修改）"""
+    global _default_cover
+    if _default_cover is None:
+        _default_cover = Image.new('RGB', (800, 800), color='#222222')
+    return _default_cover
 
-def get_track_info(path):
+# 单次解析得到的曲目信息（封面只记录位置，不解码像素）
+# cover: None 或 (kind, key)，kind 为 "apic" / "flac" / "covr"
+# cover_hash: 封面原始字节的 SHA1，同一专辑的曲目共享同一个值
+TrackInfo = namedtuple(
+    "TrackInfo",
+    ["path", "title", "artist", "album", "duration", "has_lyrics", "cover", "cover_hash"],
+)
+
+def _first_text(value):
+    """从 mutagen 的标签值（ID3 帧 / 列表）中取出第一个非空字符串"""
+    if value is None:
+        return None
+    if hasattr(value, "text"):
+        value = value.text
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+def _scan(path, keep_cover=False):
+    """
+    只打开一次文件，读取时长、标签、内嵌歌词标记和封面位置
+    :param keep_cover: 为 True 时顺带返回封面原始字节（避免再次打开文件）
+    :return: (TrackInfo, cover_bytes 或 None)
+    """
     # 默认值
     title = os.path.basename(path) # 默认用文件名
     if "." in title: title = title.rsplit(".", 1)[0] # 去掉后缀
-    
+
     artist = "Unknown Artist"
+    album = ""
     duration = 0
-    cover = get_default_cover()
+    has_lyrics = False
+    cover = None
+    cover_data = None
 
-    # --- 🟢 阶段 1: 读取时长 (保持之前的修复) ---
     try:
-        if path.lower().endswith('.mp3'):
-            audio = MP3(path)
-            duration = audio.info.length
-        elif path.lower().endswith('.flac'):
-            audio = FLAC(path)
-            duration = audio.info.length
-        elif path.lower().endswith('.m4a'):
-            audio = MP4(path)
-            duration = audio.info.length
-        else:
-            audio = MutagenFile(path)
-            if audio and audio.info: duration = audio.info.length
-    except: pass
+        audio = MutagenFile(path)
+    except Exception as e:
+        print(f"Tag Read Error: {e}")
+        audio = None
+
+    if audio is not None:
+        if audio.info:
+            duration = audio.info.length or 0
+        tags = audio.tags
+
+        try:
+            if isinstance(tags, ID3):
+                title = _first_text(tags.get("TIT2")) or title
+                artist = _first_text(tags.get("TPE1")) or artist
+                album = _first_text(tags.get("TALB")) or album
+                for k, v in tags.items():
+                    if k.startswith("USLT"):
+                        has_lyrics = True
+                    elif cover is None and k.startswith("APIC"):
+                        cover = ("apic", k)
+                        cover_data = v.data
+
+            elif isinstance(tags, MP4Tags):
+                # m4a 的键名比较特殊
+                title = _first_text(tags.get("\xa9nam")) or title   # title
+                artist = _first_text(tags.get("\xa9ART")) or artist # artist
+                album = _first_text(tags.get("\xa9alb")) or album   # album
+                has_lyrics = bool(_first_text(tags.get("\xa9lyr")))
+                if tags.get("covr"):
+                    cover = ("covr", 0)
+                    cover_data = bytes(tags["covr"][0])
 
-    # 异常时长修正
-    file_size = os.path.getsize(path)
-    if duration <= 0 or (duration > 600 and file_size < 10*1024*1024):
-        duration = (file_size * 8) / 128000 
+            elif tags is not None:
+                # Vorbis Comment（FLAC / OGG），键名不区分大小写
+                title = _first_text(tags.get("title")) or title
+                artist = _first_text(tags.get("artist")) or artist
+                album = _first_text(tags.get("album")) or album
+                has_lyrics = bool(_first_text(tags.get("lyrics")) or _first_text(tags.get("unsyncedlyrics")))
 
-    # --- 🟢 阶段 2: 增强版标签读取 (优先 Mutagen EasyID3) ---
-    # 这种方式对中文支持最好，且能自动处理 ID3v1/v2
+            if cover is None and getattr(audio, "pictures", None):
+                cover = ("flac", 0)
+                cover_data = audio.pictures[0].data
+        except Exception as e:
+            print(f"Tag Read Error: {e}")
+            # 如果读取出错，保持默认文件名
+
+    # Mutagen 无法识别标签时，尝试 TinyTag
+    if (audio is None or audio.tags is None) and TinyTag:
+        try:
+            t = TinyTag.get(path)
+            if t.title: title = t.title
+            if t.artist: artist = t.artist
+            if t.album: album = t.album
+            if duration <= 0 and t.duration: duration = t.duration
+        except Exception:
+            pass
+
+    # 异常时长修正：Mutagen 失败或结果不可信时，直接读文件头探测
     try:
-        if path.lower().endswith('.mp3'):
-            # EasyMP3 封装了常用的标签读取
-            tags = EasyMP3(path)
-            if 'title' in tags and tags['title']: 
-                title = tags['title'][0]
-            if 'artist' in tags and tags['artist']: 
-                artist = tags['artist'][0]
-        
-        elif path.lower().endswith('.flac'):
-            audio = FLAC(path)
-            if 'title' in audio: title = audio['title'][0]
-            if 'artist' in audio: artist = audio['artist'][0]
-            
-        elif path.lower().endswith('.m4a'):
-            audio = MP4(path)
-            # m4a 的键名比较特殊
-            if '\xa9nam' in audio: title = audio['\xa9nam'][0] # title
-            if '\xa9ART' in audio: artist = audio['\xa9ART'][0] # artist
-            
-        else:
-            # 如果上面都失败，尝试 TinyTag
-            if TinyTag:
-                t = TinyTag.get(path)
-                if t.title: title = t.title
-                if t.artist: artist = t.artist
+        file_size = os.path.getsize(path)
+    except OSError:
+        file_size = None  # 文件已不存在：只返回文件名等默认信息
+    if file_size is not None and _duration_suspicious(duration, file_size):
+        probed = probe.probe_duration(path)
+        if probed > 0:
+            duration = probed
 
-    except Exception as e:
-        print(f"Tag Read Error: {e}")
-        # 如果读取出错，保持默认文件名
+    cover_hash = hashlib.sha1(cover_data).hexdigest() if cover_data else None
+    info = TrackInfo(path, title, artist, album, duration, has_lyrics, cover, cover_hash)
+    return info, (cover_data if keep_cover else None)
+
+def _duration_suspicious(duration, file_size):
+    """时长为 0，或对应的平均码率明显不合理（< 8 kbps 或 > 20 Mbps）"""
+    if duration <= 0:
+        return True
+    bps = file_size * 8 / duration
+    return bps < 8000 or bps > 20000000
+
+def _decode_cover(data):
+    """把封面原始字节解码为 RGB 图像，失败返回 None"""
+    if not data:
+        return None
+    try:
+        return _to_rgb(Image.open(io.BytesIO(data)))
+    except Exception:
+        return None
+
+def _to_rgb(pil):
+    """转为 RGB；带透明通道的图片（PNG / WebP 封面）铺在白底上"""
+    if pil.mode == "RGB":
+        return pil
+    if pil.mode in ("RGBA", "LA", "P", "PA") and (pil.mode != "P" or "transparency" in pil.info):
+        rgba = pil.convert("RGBA")
+        rgb = Image.new("RGB", rgba.size, (255, 255, 255))
+        rgb.paste(rgba, mask=rgba.split()[-1])
+        return rgb
+    return pil.convert("RGB")
+
+def _read_file_bytes(path):
+    """读取封面图片文件，文件不存在或无法读取时返回 None（调用方改用默认封面）"""
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
 
-    # --- 阶段 3: 读取封面 (保持不变) ---
+
+def _read_cover_bytes(path, cover):
+    """按封面位置 (kind, key) 重新读取封面原始字节"""
+    if not cover:
+        return None
+    kind, key = cover
     try:
         f = MutagenFile(path)
-        pil = None
-        if f.tags and isinstance(f.tags, ID3):
-            for k, v in f.tags.items():
-                if k.startswith("APIC"):
-                    pil = Image.open(io.BytesIO(v.data))
-                    break
-        elif hasattr(f, 'pictures') and f.pictures:
-            pil = Image.open(io.BytesIO(f.pictures[0].data))
-        elif f.tags and 'covr' in f.tags:
-            pil = Image.open(io.BytesIO(f.tags['covr'][0]))
-        
-        if pil: cover = pil.convert("RGB")
-    except: pass
+        if kind == "apic":
+            frame = f.tags.get(key) if f.tags else None
+            return frame.data if frame else None
+        elif kind == "flac":
+            return f.pictures[key].data
+        elif kind == "covr":
+            return bytes(f.tags["covr"][key])
+    except Exception:
+        pass
+    return None
 
-    return title, artist, duration, cover
-
-def parse_lrc_content(lrc_text):
-    lyrics = {}
-    times = []
-    lines = lrc_text.splitlines()
-    for line in lines:
-        matches = re.findall(r'\[(\d+):(\d+\.?\d*)\]', line)
-        text = re.sub(r'\[.*?\]', '', line).strip()
-        if matches and text:
-            for m in matches:
-                min_v, sec_v = int(m[0]), float(m[1])
-                time_key = min_v * 60 + sec_v
-                lyrics[time_key] = text
-                times.append(time_key)
-    times.sort()
-    return lyrics, times
+class LazyCover:
+    """
+    延迟解码的封面句柄
+    - 只记录封面字节所在位置（音频文件内嵌 / 图片文件 / 内存字节）
+    - 第一次访问时才读取字节并解码
+    - 支持直接解码到目标尺寸（JPEG 用 draft，其他格式用 reduce）
+    """
+    __slots__ = ("path", "kind", "key", "digest", "_data", "_image")
 
-def get_lyrics(audio_path):
-    lrc_text = None
+    def __init__(self, path, kind, key=None, digest=None, data=None):
+        self.path = path      # 音频文件或图片文件路径
+        self.kind = kind      # "apic" / "flac" / "covr" / "file" / "bytes"
+        self.key = key        # 内嵌封面的位置
+        self.digest = digest  # 封面字节的 SHA1（可能为空，访问 data 后补齐）
+        self._data = data
+        self._image = None
+
+    @classmethod
+    def from_file(cls, image_path):
+        return cls(image_path, "file")
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(None, "bytes", data=data, digest=hashlib.sha1(data).hexdigest())
+
+    def data(self):
+        """封面原始字节（只读取一次）"""
+        if self._data is None:
+            if self.kind == "file":
+                self._data = _read_file_bytes(self.path)
+            else:
+                self._data = _read_cover_bytes(self.path, (self.kind, self.key))
+            if self._data and not self.digest:
+                self.digest = hashlib.sha1(self._data).hexdigest()
+        return self._data
+
+    def _open(self):
+        data = self.data()
+        if not data:
+            return None
+        return Image.open(io.BytesIO(data))
+
+    def image(self, size=None):
+        """
+        解码封面
+        :param size: None 返回原尺寸 RGB 图像（结果会缓存）；
+                     (w, h) 时直接解码并缩放到该尺寸，不缓存原图
+        :return: PIL Image，解码失败返回 None
+        """
+        try:
+            if size is None:
+                if self._image is None:
+                    pil = self._open()
+                    self._image = _to_rgb(pil) if pil else None
+                return self._image
+
+            pil = self._open()
+            if pil is None:
+                return None
+            pil = _reduce_for(pil, size)
+            pil = _to_rgb(pil)
+            if pil.size != tuple(size):
+                pil = pil.resize(size, Image.Resampling.LANCZOS)
+            return pil
+        except Exception as e:
+            print(f"Cover Decode Error: {e}")
+            return None
+
+    def preview(self, min_side):
+        """按比例解码，短边不小于 min_side（用于大图的快速近似）"""
+        try:
+            pil = self._open()
+            if pil is None:
+                return None
+            short = min(pil.size)
+            if short <= min_side:
+                return _to_rgb(pil)
+            w = max(1, pil.width * min_side // short)
+            h = max(1, pil.height * min_side // short)
+            return _to_rgb(_reduce_for(pil, (w, h)))
+        except Exception as e:
+            print(f"Cover Decode Error: {e}")
+            return None
+
+def _reduce_for(pil, size):
+    """在解码阶段把图片缩小到不小于 size 的最小尺寸"""
+    if pil.format == "JPEG":
+        # draft 让 JPEG 解码器直接按 1/2、1/4、1/8 解码
+        pil.draft("RGB", tuple(size))
+        return pil
+    factor = min(pil.width // max(1, size[0]), pil.height // max(1, size[1]))
+    if factor >= 2:
+        return pil.reduce(factor)
+    return pil
+
+def open_cover(info):
+    """根据 TrackInfo 创建封面句柄，没有内嵌封面时返回 None"""
+    if not info.cover:
+        return None
+    kind, key = info.cover
+    return LazyCover(info.path, kind, key, info.cover_hash)
+
+def load_cover(info):
+    """根据 TrackInfo 中记录的封面位置解码封面，没有内嵌封面时返回 None"""
+    handle = open_cover(info)
+    return handle.image() if handle else None
+
+def read_track_info(path):
+    """读取曲目信息（不解码封面）"""
+    return _scan(path)[0]
+
+def read_track(path):
+    """
+    读取曲目信息并解码内嵌封面，整个过程只打开一次文件
+    :return: (TrackInfo, PIL Image 或 None)
+    """
+    info, data = _scan(path, keep_cover=True)
+    return info, _decode_cover(data)
+
+def get_track_info(path):
+    """兼容旧接口：返回 (title, artist, duration, cover)"""
+    info, cover = read_track(path)
+    if cover is None:
+        cover = get_default_cover()
+    return info.title, info.artist, info.duration, cover
+
+def read_embedded_lyrics(audio_path):
+    """读取内嵌歌词文本（ID3 USLT / MP4 ©lyr / Vorbis LYRICS），没有时返回 None"""
     try:
         audio = MutagenFile(audio_path)
-        if audio.tags and isinstance(audio.tags, ID3):
-            for key in audio.tags.keys():
+        tags = audio.tags if audio else None
+        if isinstance(tags, ID3):
+            for key in tags.keys():
                 if key.startswith("USLT"):
-                    lrc_text = str(audio.tags[key])
-                    break
-        elif hasattr(audio, 'tags') and 'LYRICS' in audio.tags:
-            lrc_text = audio.tags['LYRICS'][0]
+                    return str(tags[key])
+        elif isinstance(tags, MP4Tags):
+            return _first_text(tags.get("\xa9lyr"))
+        elif tags is not None:
+            return _first_text(tags.get("lyrics")) or _first_text(tags.get("unsyncedlyrics"))
     except: pass
+    return None
+
+def sidecar_lrc_path(audio_path):
+    """与音频同名的 .lrc 文件路径"""
+    return os.path.splitext(audio_path)[0] + ".lrc"
+
+def get_lyrics(audio_path):
+    """读取内嵌歌词或同名 .lrc 文件，返回 lrc.LyricTimeline"""
+    lrc_text = read_embedded_lyrics(audio_path)
 
     if not lrc_text:
-        base = os.path.splitext(audio_path)[0]
-        lrc_path = base + ".lrc"
+        lrc_path = sidecar_lrc_path(audio_path)
         if os.path.exists(lrc_path):
             try:
                 with open(lrc_path, 'r', encoding='utf-8') as f:
                     lrc_text = f.read()
             except: pass
 
-    if lrc_text:
-        return parse_lrc_content(lrc_text)
-    return {}, []
+    return lrc.parse(lrc_text)
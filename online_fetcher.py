@@ -3,21 +3,334 @@
 在线资源获取模块
 - 来源：网易云音乐增强API (本地部署推荐)
 """
-import sys
-import requests
+import json
+import time
+import sqlite3
+import threading
 import re
+from difflib import SequenceMatcher
+from collections import OrderedDict
+from concurrent.futures import Future
+import requests
 from PIL import Image
 from io import BytesIO
 import os
+import config
+import lrc
+import utils
+import metadata
+import cache_store
+from cache_store import normalize, song_key
 
 # 禁用 SSL 警告
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+
+# 标题中的版本后缀："(Live)"、"（伴奏）"、"[Remix]"、" - Remastered 2009"
+_TITLE_SUFFIX = re.compile(r'\s*(?:[(（\[【].*?[)）\]】]|\s-\s.*)\s*$')
+
+
+def _base_title(title):
+    return _TITLE_SUFFIX.sub('', title or '') or title
+
+
+def _similarity(a, b):
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def score_candidate(candidate, title, artist, duration=None):
+    """
+    候选歌曲与本地曲目的匹配度 (0 ~ 1)
+    - 标题相似度（归一化后，忽略版本后缀再比一次取较高值）
+    - 歌手重合度（取候选歌手中最相近的一个；本地歌手未知时不计）
+    - 时长接近程度（相差 0 秒为 1，相差 CANDIDATE_DURATION_TOLERANCE 秒及以上为 0；任一方未知时不计）
+    """
+    name = candidate.get('name')
+    title_score = max(_similarity(normalize(title), normalize(name)),
+                      0.95 * _similarity(normalize(_base_title(title)), normalize(_base_title(name))))
+    parts = [(0.55, title_score)]
+
+    local_artist = normalize(artist)
+    if local_artist and local_artist != normalize("Unknown Artist"):
+        names = [normalize(a) for a in candidate.get('artists', [])]
+        best = max((_similarity(local_artist, n) for n in names), default=0.0)
+        # 本地多歌手合写时（"A / B"），只要包含候选歌手即算重合
+        if any(n and n in local_artist for n in names):
+            best = max(best, 0.9)
+        parts.append((0.25, best))
+
+    remote = candidate.get('duration') or 0
+    if duration and remote:
+        tolerance = config.CANDIDATE_DURATION_TOLERANCE
+        parts.append((0.20, max(0.0, 1 - abs(duration - remote) / tolerance)))
+
+    total = sum(w for w, _ in parts)
+    return sum(w * s for w, s in parts) / total
+
+
+def rank_candidates(candidates, title, artist, duration=None):
+    """按匹配度从高到低排序（写入 'score' 字段），丢弃低于 CANDIDATE_MIN_SCORE 的候选"""
+    for c in candidates:
+        c['score'] = round(score_candidate(c, title, artist, duration), 3)
+    ranked = sorted(candidates, key=_candidate_score, reverse=True)
+    return [c for c in ranked if c['score'] >= config.CANDIDATE_MIN_SCORE]
+
+
+def _candidate_score(candidate):
+    return candidate['score']
+
+
+def sized_pic_url(url, size=None):
+    """
+    给网易云图片地址加上尺寸参数，服务器返回缩放后的图片
+    例: http://p1.music.126.net/xxx.jpg → http://p1.music.126.net/xxx.jpg?param=512y512
+    """
+    size = size or config.COVER_FETCH_SIZE
+    if not size or "param=" in url:
+        return url
+    sep = "&" if "?" in url else "?"
+    return f"{url}{sep}param={size}y{size}"
+
+
+class ResolutionCache:
+    """
+    歌曲解析结果缓存：(标题, 歌手, 时长) → 搜索到的候选歌曲
+    - 内存 LRU + SQLite 持久化（sinf/online.db）
+    - 超过 TTL 的记录视为过期
+    - 歌词和封面共用同一次搜索结果
+    """
+
+    def __init__(self, db_path, ttl=None, memory_items=256):
+        self.ttl = ttl if ttl is not None else config.RESOLVE_CACHE_TTL
+        self.memory_items = memory_items
+        self._lock = threading.RLock()
+        self._memory = OrderedDict()  # key -> (created, candidates)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS resolved ("
+            "key TEXT PRIMARY KEY, candidates TEXT NOT NULL, created REAL NOT NULL)")
+        self._conn.commit()
+
+    def get(self, key):
+        """返回候选歌曲列表，未缓存或已过期时返回 None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                row = self._conn.execute(
+                    "SELECT created, candidates FROM resolved WHERE key=?", (key,)).fetchone()
+                if row is None:
+                    return None
+                entry = (row[0], json.loads(row[1]))
+                self._remember(key, entry)
+            if now - entry[0] > self.ttl:
+                return None
+            self._memory.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, candidates):
+        entry = (time.time(), candidates)
+        with self._lock:
+            self._remember(key, entry)
+            self._conn.execute("INSERT OR REPLACE INTO resolved VALUES (?, ?, ?)",
+                               (key, json.dumps(candidates, ensure_ascii=False), entry[0]))
+            self._conn.commit()
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+
+class MissCache:
+    """
+    未命中缓存：API 明确没有歌词 / 封面的歌曲（sinf/online.db）
+    - 以归一化的 (标题, 歌手) 和类型 (lyrics / cover) 为键
+    - TTL 内再次播放只需一次本地查询，不再请求网络
+    - 网络错误、超时不会记录，只记录 API 正常返回但没有结果的情况
+    """
+
+    def __init__(self, db_path, ttl=None, memory_items=256):
+        self.ttl = ttl if ttl is not None else config.MISS_CACHE_TTL
+        self.memory_items = memory_items
+        self._lock = threading.RLock()
+        self._memory = OrderedDict()  # (key, kind) -> created
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS misses ("
+            "key TEXT NOT NULL, kind TEXT NOT NULL, created REAL NOT NULL, "
+            "PRIMARY KEY (key, kind))")
+        self._conn.commit()
+
+    @staticmethod
+    def key(title, artist):
+        return f"{normalize(title)}|{normalize(artist)}"
+
+    def is_miss(self, title, artist, kind):
+        """TTL 内是否已确认没有结果"""
+        k = (self.key(title, artist), kind)
+        with self._lock:
+            created = self._memory.get(k)
+            if created is None:
+                row = self._conn.execute(
+                    "SELECT created FROM misses WHERE key=? AND kind=?", k).fetchone()
+                if row is None:
+                    return False
+                created = row[0]
+                self._remember(k, created)
+            self._memory.move_to_end(k)
+            return time.time() - created <= self.ttl
+
+    def put(self, title, artist, kind):
+        k = (self.key(title, artist), kind)
+        now = time.time()
+        with self._lock:
+            self._remember(k, now)
+            self._conn.execute("INSERT OR REPLACE INTO misses VALUES (?, ?, ?)", (*k, now))
+            self._conn.commit()
+
+    def purge(self, title=None, artist=None, kind=None):
+        """
+        清除未命中记录
+        - 不带参数：清空全部
+        - 指定标题和歌手：只清除这首歌（可再指定 kind）
+        :return: 删除的条数
+        """
+        sql, args = "DELETE FROM misses", []
+        if title is not None or artist is not None:
+            sql += " WHERE key=?"
+            args.append(self.key(title, artist))
+            if kind:
+                sql += " AND kind=?"
+                args.append(kind)
+        elif kind:
+            sql += " WHERE kind=?"
+            args.append(kind)
+        with self._lock:
+            count = self._conn.execute(sql, args).rowcount
+            self._conn.commit()
+            self._memory.clear()
+        print(f"[未命中缓存] 已清除 {count} 条记录")
+        return count
+
+    def _remember(self, k, created):
+        self._memory[k] = created
+        self._memory.move_to_end(k)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+
+class ApiUnavailable(requests.exceptions.ConnectionError):
+    """熔断器打开期间不发请求，直接失败"""
+
+
+class CircuitBreaker:
+    """
+    API 健康状态（熔断器）
+    - closed: 正常请求
+    - open: 连续失败达到阈值后打开，期间所有请求本地直接失败
+    - half_open: 退避时间到后放行一个探测请求，成功则恢复，失败则退避时间翻倍
+    - 每次状态变化 generation 加一；allow() 返回请求发出时的 generation，
+      早于当前状态发出的请求（熔断前已在进行中）失败时不再计数，不会重复打开、翻倍退避
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold=None, base_backoff=None, max_backoff=None, on_change=None):
+        self.threshold = threshold or config.API_FAILURE_THRESHOLD
+        self.base_backoff = base_backoff or config.API_BACKOFF_BASE
+        self.max_backoff = max_backoff or config.API_BACKOFF_MAX
+        self.on_change = on_change  # 状态变化回调 fn(status)，在请求线程中调用
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0     # 连续失败次数
+        self.trips = 0        # 连续打开次数（决定退避时间）
+        self.retry_at = 0.0   # open 状态下允许下一次探测的时间
+        self.generation = 0   # 状态变化次数
+        self._probing = False
+
+    def allow(self):
+        """
+        是否可以发出请求
+        :return: 可以时返回当前 generation（交给 record_failure），不可以时返回 None
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return self.generation
+            if self.state == self.OPEN and time.time() >= self.retry_at:
+                self.state = self.HALF_OPEN
+                self.generation += 1
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True  # 同一时间只放行一个探测请求
+                return self.generation
+            return None
+
+    def record_success(self):
+        with self._lock:
+            changed = self.state != self.CLOSED
+            if changed:
+                self.generation += 1
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trips = 0
+            self._probing = False
+        if changed:
+            print(f"[在线获取] ✓ API 已恢复")
+            self._notify()
+
+    def record_failure(self, generation=None):
+        """:param generation: 请求发出时 allow() 的返回值，早于当前状态的失败不计数"""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                backoff = min(self.max_backoff, self.base_backoff * (2 ** self.trips))
+                self.trips += 1
+                self.state = self.OPEN
+                self.generation += 1
+                self.retry_at = time.time() + backoff
+                self._probing = False
+                opened = True
+            else:
+                opened = False
+        if opened:
+            print(f"[在线获取] ✗ API 不可用，{backoff:.0f} 秒后重试")
+            self._notify()
+
+    def status(self):
+        """
+        当前状态
+        :return: {'state', 'failures', 'retry_in'}，retry_in 为距离下次探测的秒数
+        """
+        with self._lock:
+            retry_in = max(0.0, self.retry_at - time.time()) if self.state == self.OPEN else 0.0
+            return {"state": self.state, "failures": self.failures, "retry_in": retry_in}
+
+    def _notify(self):
+        if self.on_change:
+            try:
+                self.on_change(self.status())
+            except Exception as e:
+                print(f"[在线获取] 状态回调失败: {e}")
+
+
 class OnlineFetcher:
     """在线资源获取器"""
     
-    def __init__(self):
+    def __init__(self, api_url=None, cache_dir=None):
+        """
+        :param api_url: API 地址，默认使用下方配置
+        :param cache_dir: 缓存目录，默认 sinf
+        """
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
@@ -27,109 +340,279 @@ class OnlineFetcher:
         # ===== 网易云音乐增强API配置 =====
         # 项目地址: https://github.com/NeteaseCloudMusicApiEnhanced/api-enhanced
         # 推荐本地部署：http://localhost:3000
-        self.netease_api = "http://yourip:3000"  # ← 修改为你的API地址
+        self.netease_api = api_url or "http://yourip:3000"  # ← 修改为你的API地址
         
-        # 创建缓存目录（兼容脚本和EXE）
-        if getattr(sys, 'frozen', False):
-            script_dir = os.path.dirname(sys.executable)
+        # 缓存目录（兼容脚本和EXE）
+        if cache_dir is None:
+            self.cache_dir = utils.get_cache_dir()
+            self.store = cache_store.get_store()
         else:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        self.cache_dir = os.path.join(script_dir, "sinf")
-        if not os.path.exists(self.cache_dir):
-            os.makedirs(self.cache_dir)
-            print(f"[缓存] 创建缓存目录: {self.cache_dir}")
+            os.makedirs(cache_dir, exist_ok=True)
+            self.cache_dir = cache_dir
+            self.store = cache_store.CacheStore(cache_dir)
+
+        self.resolutions = ResolutionCache(os.path.join(self.cache_dir, "online.db"))
+        self.misses = MissCache(os.path.join(self.cache_dir, "online.db"))
+        self.breaker = CircuitBreaker()
+        self._resolve_lock = threading.Lock()
+        self._resolving = {}  # 歌曲键 -> 进行中的搜索（Future）
     
     # ==================== 公开接口 ====================
     
-    def fetch_lyrics(self, title, artist):
+    def fetch_lyrics(self, title, artist, duration=None):
         """
         获取歌词（优先级：缓存 → 网易云）
-        :return: (lyrics_map, time_points)
+        :return: lrc.LyricTimeline（未找到时为空）
         """
         print(f"[在线获取] 正在搜索歌词: {title} - {artist}")
         
         # 1. 检查本地缓存
-        lyrics_map, time_points = self._load_lyrics_from_cache(title)
-        if lyrics_map:
-            return lyrics_map, time_points
+        timeline = self._load_lyrics_from_cache(title, artist, duration)
+        if timeline:
+            return timeline
         
-        # 2. 从网易云API获取
-        lyrics_map, time_points, lrc_text = self._fetch_lyrics_from_netease(title, artist)
-        if lyrics_map:
+        # 2. 之前确认过没有歌词，TTL 内不再请求
+        if self.misses.is_miss(title, artist, "lyrics"):
+            print(f"[在线获取] ✗ 已知无歌词（未命中缓存）")
+            return lrc.EMPTY
+        
+        # 3. 从网易云API获取
+        timeline, lrc_text = self._fetch_lyrics_from_netease(title, artist, duration)
+        if timeline:
             print(f"[在线获取] ✓ 成功获取歌词（来源：网易云）")
-            self._save_lyrics_to_file(title, lrc_text)
-            return lyrics_map, time_points
+            self._save_lyrics_to_file(title, artist, duration, lrc_text)
+            return timeline
         
         print(f"[在线获取] ✗ 未找到歌词")
-        return {}, []
+        return lrc.EMPTY
     
-    def fetch_cover(self, title, artist):
+    def fetch_cover(self, title, artist, duration=None):
         """
         获取封面（优先级：缓存 → 网易云）
-        :return: PIL Image 对象或 None
+        :return: metadata.LazyCover（原始图片字节，按需解码）或 None
         """
         print(f"[在线获取] 正在搜索封面: {title} - {artist}")
         
         # 1. 检查本地缓存
-        cover = self._load_cover_from_cache(title)
+        cover = self._load_cover_from_cache(title, artist, duration)
         if cover:
             return cover
         
-        # 2. 从网易云获取
-        cover = self._fetch_cover_from_netease(title, artist)
-        if cover:
+        # 2. 之前确认过没有封面，TTL 内不再请求
+        if self.misses.is_miss(title, artist, "cover"):
+            print(f"[在线获取] ✗ 已知无封面（未命中缓存）")
+            return None
+        
+        # 3. 从网易云获取
+        downloaded = self._fetch_cover_from_netease(title, artist, duration)
+        if downloaded:
             print(f"[在线获取] ✓ 成功获取封面（来源：网易云）")
-            self._save_cover_to_file(title, cover)
-            return cover
+            path = self._save_cover_to_file(title, artist, duration, *downloaded)
+            if path:
+                return metadata.LazyCover.from_file(path)
+            return metadata.LazyCover.from_bytes(downloaded[0])
         
         print(f"[在线获取] ✗ 未找到封面")
         return None
     
-    # ==================== 网易云API ====================
+    def status(self):
+        """API 健康状态，见 CircuitBreaker.status()"""
+        return self.breaker.status()
     
-    def _fetch_lyrics_from_netease(self, title, artist):
-        """从网易云音乐增强API获取歌词"""
+    # ==================== 歌曲解析 ====================
+
+    def resolve(self, title, artist, duration=None):
+        """
+        把 (标题, 歌手, 时长) 解析为网易云候选歌曲（结果缓存，歌词和封面共用）
+        :return: [{'id', 'name', 'artists', 'duration', 'pic_url', 'score'}, ...]，
+                 按匹配度从高到低排序；未找到（或都不匹配）时为空列表，请求失败时为 None
+        """
+        key = song_key(title, artist, duration)
+        candidates = self._cached_resolution(key, title, artist, duration)
+        if candidates is not None:
+            return candidates
+
+        # 同一首歌同时只搜索一次：歌词和封面同时请求时，后到的等待先到的结果
+        with self._resolve_lock:
+            future = self._resolving.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._resolving[key] = future
+        if not owner:
+            return future.result()
         try:
-            # 步骤1: 搜索歌曲
-            print(f"[网易云-歌词] 搜索歌曲...")
-            search_url = f"{self.netease_api}/search"
-            params = {
-                'keywords': f"{title} {artist}",
-                'type': 1,  # 单曲
-                'limit': 5   # 获取前5个结果
-            }
-            
-            response = self.session.get(search_url, params=params, timeout=self.timeout)
+            # 上一个搜索可能刚刚结束，结果已在缓存中
+            candidates = self._cached_resolution(key, title, artist, duration)
+            if candidates is None:
+                candidates = self._resolve_online(key, title, artist, duration)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(candidates)
+        finally:
+            with self._resolve_lock:
+                del self._resolving[key]
+        return candidates
+
+    def _cached_resolution(self, key, title, artist, duration):
+        candidates = self.resolutions.get(key)
+        if candidates is not None:
+            print(f"[解析缓存] ✓ 命中: {title} - {artist}")
+            if candidates and 'score' not in candidates[0]:
+                candidates = rank_candidates(candidates, title, artist, duration)
+        return candidates
+
+    def _resolve_online(self, key, title, artist, duration):
+        candidates = self._search_netease(title, artist)
+        if candidates:
+            found = len(candidates)
+            candidates = rank_candidates(candidates, title, artist, duration)
+            if candidates:
+                best = candidates[0]
+                print(f"[网易云] 最佳匹配: {best['name']} - {'/'.join(best['artists'])} "
+                      f"(匹配度 {best['score']:.2f})")
+            else:
+                print(f"[网易云] {found} 个搜索结果均不匹配")
+            self.resolutions.put(key, candidates)
+        return candidates
+
+    def _resolve_pic_url(self, title, artist, duration, candidates):
+        """
+        获取最佳候选的专辑封面 URL，首次需要请求 /song/detail，结果写回解析缓存
+        :return: URL；歌曲没有封面时为空字符串，请求失败时为 None
+        """
+        best = candidates[0]
+        if best.get('pic_url'):
+            return best['pic_url']
+
+        print(f"[网易云-封面] 获取歌曲详情...")
+        detail_response = self._api_get("/song/detail", {'ids': best['id']})
+        if detail_response.status_code != 200:
+            print(f"[网易云-封面] 获取详情失败 (状态码: {detail_response.status_code})")
+            return None
+
+        songs_detail = detail_response.json().get('songs', [])
+        if not songs_detail:
+            print(f"[网易云-封面] 详情数据为空")
+            return ""
+
+        # 'al' 是 album 的缩写
+        best['pic_url'] = songs_detail[0].get('al', {}).get('picUrl')
+        if best['pic_url']:
+            self.resolutions.put(song_key(title, artist, duration), candidates)
+        return best['pic_url'] or ""
+
+    def fill_pic_urls(self, resolved, batch_size=None):
+        """
+        批量补齐最佳候选的封面 URL：/song/detail 的 ids 参数一次查询多首
+        :param resolved: [(title, artist, duration, candidates), ...]（candidates 来自 resolve）
+        :return: 发出的 /song/detail 请求数
+        """
+        batch_size = batch_size or config.DETAIL_BATCH_SIZE
+        pending = [item for item in resolved if item[3] and not item[3][0].get('pic_url')]
+        requests_made = 0
+        for i in range(0, len(pending), batch_size):
+            chunk = pending[i:i + batch_size]
+            ids = ",".join(str(item[3][0]['id']) for item in chunk)
+            requests_made += 1
+            response = self._api_get("/song/detail", {'ids': ids})
             if response.status_code != 200:
-                print(f"[网易云-歌词] 搜索失败 (状态码: {response.status_code})")
-                return {}, [], None
-            
-            data = response.json()
-            songs = data.get('result', {}).get('songs', [])
-            
+                print(f"[网易云-封面] 批量获取详情失败 (状态码: {response.status_code})")
+                continue
+
+            pics = {song.get('id'): song.get('al', {}).get('picUrl') or ""
+                    for song in response.json().get('songs', [])}
+            for title, artist, duration, candidates in chunk:
+                best = candidates[0]
+                if best['id'] not in pics:
+                    continue
+                if pics[best['id']]:
+                    best['pic_url'] = pics[best['id']]
+                    self.resolutions.put(song_key(title, artist, duration), candidates)
+                else:
+                    self.misses.put(title, artist, "cover")
+        return requests_made
+
+    # ==================== 网易云API ====================
+
+    def _api_get(self, path, params):
+        """
+        请求 API，结果计入熔断器
+        - 连接失败、超时、5xx 计为失败
+        - 熔断期间直接抛出 ApiUnavailable，不发请求
+        """
+        generation = self.breaker.allow()
+        if generation is None:
+            raise ApiUnavailable(self.netease_api)
+        try:
+            response = self.session.get(f"{self.netease_api}{path}", params=params, timeout=self.timeout)
+        except Exception:
+            self.breaker.record_failure(generation)
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure(generation)
+        else:
+            self.breaker.record_success()
+        return response
+
+    def _search_netease(self, title, artist):
+        """搜索歌曲，返回前几个候选（请求失败时返回 None）"""
+        print(f"[网易云] 搜索歌曲: {title} - {artist}")
+        params = {
+            'keywords': f"{title} {artist}",
+            'type': 1,  # 单曲
+            'limit': 5   # 获取前5个结果
+        }
+
+        response = self._api_get("/search", params)
+        if response.status_code != 200:
+            print(f"[网易云] 搜索失败 (状态码: {response.status_code})")
+            return None
+
+        songs = response.json().get('result', {}).get('songs', [])
+        if not songs:
+            print(f"[网易云] 未找到歌曲")
+            return []
+
+        return [{
+            'id': song['id'],
+            'name': song.get('name', ''),
+            'artists': [ar['name'] for ar in song.get('artists', [])],
+            'duration': song.get('duration', 0) / 1000,
+            'pic_url': None,
+        } for song in songs]
+
+    def _fetch_lyrics_from_netease(self, title, artist, duration=None):
+        """从网易云音乐增强API获取歌词"""
+        try:
+            # 步骤1: 解析歌曲（优先使用缓存的搜索结果）
+            songs = self.resolve(title, artist, duration)
             if not songs:
-                print(f"[网易云-歌词] 未找到歌曲")
-                return {}, [], None
+                if songs is not None:
+                    self.misses.put(title, artist, "lyrics")
+                return lrc.EMPTY, None
             
-            # 步骤2: 尝试多个搜索结果（提高准确性）
-            for i, song in enumerate(songs[:3], 1):
+            # 步骤2: 最佳候选足够可信时只请求它，否则按匹配度依次尝试前 3 个
+            if songs[0].get('score', 0) >= config.CANDIDATE_CONFIDENT_SCORE:
+                tries = songs[:1]
+            else:
+                tries = songs[:3]
+            failed = False  # 有请求失败时结果不确定，不记录未命中
+            for i, song in enumerate(tries, 1):
                 song_id = song['id']
-                song_name = song['name']
-                artists = '/'.join([ar['name'] for ar in song.get('artists', [])])
+                artists = '/'.join(song['artists'])
                 
-                print(f"[网易云-歌词] 尝试 {i}/3: {song_name} - {artists} (ID: {song_id})")
+                print(f"[网易云-歌词] 尝试 {i}/{len(tries)}: {song['name']} - {artists} "
+                      f"(ID: {song_id}, 匹配度 {song.get('score', 0):.2f})")
                 
                 # 步骤3: 获取歌词
-                lyric_url = f"{self.netease_api}/lyric"
-                lyric_response = self.session.get(
-                    lyric_url,
-                    params={'id': song_id},
-                    timeout=self.timeout
-                )
+                lyric_response = self._api_get("/lyric", {'id': song_id})
                 
                 if lyric_response.status_code != 200:
                     print(f"[网易云-歌词] 获取失败 (状态码: {lyric_response.status_code})")
+                    failed = True
                     continue
                 
                 lyric_data = lyric_response.json()
@@ -137,102 +620,77 @@ class OnlineFetcher:
                 
                 if lrc_text:
                     # 步骤4: 解析歌词
-                    lyrics_map, time_points = self._parse_lrc(lrc_text)
-                    if lyrics_map:
-                        print(f"[网易云-歌词] ✓ 获取成功 ({len(lyrics_map)}行)")
-                        return lyrics_map, time_points, lrc_text
+                    timeline = lrc.parse(lrc_text)
+                    if timeline:
+                        print(f"[网易云-歌词] ✓ 获取成功 ({len(timeline)}行)")
+                        return timeline, lrc_text
                     else:
                         print(f"[网易云-歌词] 歌词格式无效")
                 else:
                     print(f"[网易云-歌词] 该歌曲无歌词")
             
             print(f"[网易云-歌词] 所有结果均无有效歌词")
-            return {}, [], None
+            if not failed:
+                self.misses.put(title, artist, "lyrics")
+            return lrc.EMPTY, None
             
+        except ApiUnavailable:
+            print(f"[网易云-歌词] API 暂不可用，跳过")
+            return lrc.EMPTY, None
         except requests.exceptions.Timeout:
             print(f"[网易云-歌词] 连接超时")
-            return {}, [], None
+            return lrc.EMPTY, None
         except requests.exceptions.ConnectionError:
             print(f"[网易云-歌词] 连接失败 - 请确认API运行: {self.netease_api}")
-            return {}, [], None
+            return lrc.EMPTY, None
         except Exception as e:
             print(f"[网易云-歌词] 异常: {e}")
-            return {}, [], None
+            return lrc.EMPTY, None
     
-    def _fetch_cover_from_netease(self, title, artist):
-        """从网易云音乐增强API获取封面"""
+    def _fetch_cover_from_netease(self, title, artist, duration=None):
+        """
+        从网易云音乐增强API获取封面
+        :return: (原始字节, 格式, (宽, 高)) 或 None
+        """
         try:
-            # 步骤1: 搜索歌曲，获取ID
-            print(f"[网易云-封面] 搜索歌曲...")
-            search_url = f"{self.netease_api}/search"
-            params = {
-                'keywords': f"{title} {artist}",
-                'type': 1,  # 单曲
-                'limit': 1
-            }
-            
-            response = self.session.get(search_url, params=params, timeout=self.timeout)
-            if response.status_code != 200:
-                print(f"[网易云-封面] 搜索失败 (状态码: {response.status_code})")
-                return None
-            
-            data = response.json()
-            songs = data.get('result', {}).get('songs', [])
-            
+            # 步骤1: 解析歌曲（与歌词共用搜索结果）
+            songs = self.resolve(title, artist, duration)
             if not songs:
-                print(f"[网易云-封面] 未找到歌曲")
+                if songs is not None:
+                    self.misses.put(title, artist, "cover")
                 return None
             
-            # 获取第一个结果的歌曲ID
-            song_id = songs[0]['id']
-            song_name = songs[0]['name']
-            artists = '/'.join([ar['name'] for ar in songs[0].get('artists', [])])
-            
-            print(f"[网易云-封面] 找到: {song_name} - {artists} (ID: {song_id})")
-            
-            # 步骤2: 使用 /song/detail 获取详细信息
-            print(f"[网易云-封面] 获取歌曲详情...")
-            detail_url = f"{self.netease_api}/song/detail"
-            detail_response = self.session.get(
-                detail_url,
-                params={'ids': song_id},
-                timeout=self.timeout
-            )
-            
-            if detail_response.status_code != 200:
-                print(f"[网易云-封面] 获取详情失败 (状态码: {detail_response.status_code})")
-                return None
-            
-            detail_data = detail_response.json()
-            songs_detail = detail_data.get('songs', [])
-            
-            if not songs_detail:
-                print(f"[网易云-封面] 详情数据为空")
-                return None
-            
-            # 步骤3: 提取专辑封面URL
-            album = songs_detail[0].get('al', {})  # 'al' 是 album 的缩写
-            cover_url = album.get('picUrl')
+            best = songs[0]
+            print(f"[网易云-封面] 找到: {best['name']} - {'/'.join(best['artists'])} (ID: {best['id']})")
             
+            # 步骤2: 提取专辑封面URL（/song/detail 结果同样缓存）
+            cover_url = self._resolve_pic_url(title, artist, duration, songs)
             if not cover_url:
                 print(f"[网易云-封面] 未找到封面URL")
+                if cover_url == "":
+                    self.misses.put(title, artist, "cover")
                 return None
             
             print(f"[网易云-封面] 封面URL: {cover_url[:60]}...")
             
-            # 步骤4: 下载封面图片
+            # 步骤3: 下载封面图片（让服务器按显示尺寸缩放，不下载原图）
             print(f"[网易云-封面] 下载封面...")
-            img_response = self.session.get(cover_url, timeout=self.timeout)
+            img_response = self.session.get(sized_pic_url(cover_url), timeout=self.timeout)
             if img_response.status_code != 200:
                 print(f"[网易云-封面] 下载失败 (状态码: {img_response.status_code})")
                 return None
             
-            # 步骤5: 转换为PIL Image对象
-            cover_image = Image.open(BytesIO(img_response.content))
-            print(f"[网易云-封面] ✓ 封面下载成功 ({cover_image.size[0]}x{cover_image.size[1]})")
+            # 步骤4: 只读取图片头获得格式和尺寸，不解码像素
+            data = img_response.content
+            with Image.open(BytesIO(data)) as probe_image:
+                fmt, size = probe_image.format, probe_image.size
+            print(f"[网易云-封面] ✓ 封面下载成功 ({size[0]}x{size[1]} {fmt}, {len(data) // 1024} KB)")
             
-            return cover_image
+            return data, fmt, size
             
+        except ApiUnavailable:
+            print(f"[网易云-封面] API 暂不可用，跳过")
+            return None
         except requests.exceptions.Timeout:
             print(f"[网易云-封面] 连接超时")
             return None
@@ -243,107 +701,47 @@ class OnlineFetcher:
             print(f"[网易云-封面] 异常: {e}")
             return None
     
-    # ==================== 工具方法 ====================
-    
-    def _parse_lrc(self, lrc_text):
-        """解析LRC格式歌词"""
-        lyrics_map = {}
-        time_points = []
-        
-        # LRC格式: [mm:ss.xx]歌词文本
-        pattern = r'\[(\d{2}):(\d{2})\.(\d{2,3})\](.*)'
-        
-        for line in lrc_text.split('\n'):
-            match = re.match(pattern, line)
-            if match:
-                minutes = int(match.group(1))
-                seconds = int(match.group(2))
-                milliseconds = int(match.group(3))
-                text = match.group(4).strip()
-                
-                time_in_seconds = minutes * 60 + seconds + milliseconds / 1000
-                
-                if text:
-                    lyrics_map[time_in_seconds] = text
-                    time_points.append(time_in_seconds)
-        
-        time_points.sort()
-        return lyrics_map, time_points
-    
-    def _get_safe_filename(self, title):
-        """生成安全的文件名"""
-        invalid_chars = '<>:"/\\|?*'
-        safe_name = title
-        for char in invalid_chars:
-            safe_name = safe_name.replace(char, '_')
-        if len(safe_name) > 200:
-            safe_name = safe_name[:200]
-        return safe_name
-    
     # ==================== 本地缓存 ====================
     
-    def _save_lyrics_to_file(self, title, lrc_text):
-        """保存歌词到本地"""
+    def _save_lyrics_to_file(self, title, artist, duration, lrc_text):
+        """保存歌词到本地缓存"""
         try:
-            safe_title = self._get_safe_filename(title)
-            lrc_path = os.path.join(self.cache_dir, f"{safe_title}.lrc")
-            
-            with open(lrc_path, 'w', encoding='utf-8') as f:
-                f.write(lrc_text)
-            
-            print(f"[缓存] 歌词已保存: {safe_title}.lrc")
+            self.store.put_text(title, artist, duration, "lyrics", lrc_text)
+            print(f"[缓存] 歌词已保存: {title} - {artist}")
         except Exception as e:
             print(f"[缓存] 保存歌词失败: {e}")
     
-    def _save_cover_to_file(self, title, cover_image):
-        """保存封面到本地"""
+    def _save_cover_to_file(self, title, artist, duration, data, fmt, size):
+        """保存封面原始字节到本地缓存，返回缓存文件路径（失败时为 None）"""
         try:
-            safe_title = self._get_safe_filename(title)
-            
-            # 转换为RGB模式
-            if cover_image.mode in ('RGBA', 'LA', 'P'):
-                rgb_image = Image.new('RGB', cover_image.size, (255, 255, 255))
-                if cover_image.mode == 'P':
-                    cover_image = cover_image.convert('RGBA')
-                rgb_image.paste(cover_image, mask=cover_image.split()[-1] if cover_image.mode == 'RGBA' else None)
-                cover_image = rgb_image
-            
-            jpg_path = os.path.join(self.cache_dir, f"{safe_title}.jpg")
-            cover_image.save(jpg_path, 'JPEG', quality=95)
-            
-            print(f"[缓存] 封面已保存: {safe_title}.jpg")
+            path = self.store.put_bytes(title, artist, duration, "cover", data, fmt, size)
+            print(f"[缓存] 封面已保存: {title} - {artist}")
+            return path
         except Exception as e:
             print(f"[缓存] 保存封面失败: {e}")
+            return None
     
-    def _load_lyrics_from_cache(self, title):
+    def _load_lyrics_from_cache(self, title, artist, duration):
         """从缓存加载歌词"""
         try:
-            safe_title = self._get_safe_filename(title)
-            lrc_path = os.path.join(self.cache_dir, f"{safe_title}.lrc")
+            lrc_text = self.store.read_text(title, artist, duration, "lyrics")
+            if lrc_text:
+                timeline = lrc.parse(lrc_text)
+                if timeline:
+                    print(f"[缓存] ✓ 从缓存加载歌词: {title} - {artist}")
+                    return timeline
             
-            if os.path.exists(lrc_path):
-                with open(lrc_path, 'r', encoding='utf-8') as f:
-                    lrc_text = f.read()
-                
-                lyrics_map, time_points = self._parse_lrc(lrc_text)
-                if lyrics_map:
-                    print(f"[缓存] ✓ 从缓存加载歌词: {safe_title}.lrc")
-                    return lyrics_map, time_points
-            
-            return {}, []
+            return lrc.EMPTY
         except Exception:
-            return {}, []
+            return lrc.EMPTY
     
-    def _load_cover_from_cache(self, title):
-        """从缓存加载封面"""
+    def _load_cover_from_cache(self, title, artist, duration):
+        """从缓存加载封面（只返回文件句柄，显示时再按需要的尺寸解码）"""
         try:
-            safe_title = self._get_safe_filename(title)
-            jpg_path = os.path.join(self.cache_dir, f"{safe_title}.jpg")
-            
-            if os.path.exists(jpg_path):
-                cover_image = Image.open(jpg_path)
-                print(f"[缓存] ✓ 从缓存加载封面: {safe_title}.jpg")
-                return cover_image
+            path = self.store.get_path(title, artist, duration, "cover", verify=True)
+            if path:
+                print(f"[缓存] ✓ 从缓存加载封面: {title} - {artist}")
+                return metadata.LazyCover.from_file(path)
             
             return None
         except Exception:
@@ -361,12 +759,16 @@ def get_fetcher():
         _fetcher = OnlineFetcher()
     return _fetcher
 
-def fetch_lyrics_online(title, artist):
+def fetch_lyrics_online(title, artist, duration=None):
     """便捷函数：从网络获取歌词"""
     fetcher = get_fetcher()
-    return fetcher.fetch_lyrics(title, artist)
+    return fetcher.fetch_lyrics(title, artist, duration)
 
-def fetch_cover_online(title, artist):
+def fetch_cover_online(title, artist, duration=None):
     """便捷函数：从网络获取封面"""
     fetcher = get_fetcher()
-    return fetcher.fetch_cover(title, artist)
\ No newline at end of file
+    return fetcher.fetch_cover(title, artist, duration)
+
+def purge_online_misses(title=None, artist=None, kind=None):
+    """便捷函数：清除未命中缓存（不带参数时清空全部）"""
+    return get_fetcher().misses.purge(title, artist, kind)
\ No newline at end of file
@@ -0,0 +1,173 @@
+# prefetch.py
+"""
+播放列表预取
+- 当前歌曲播放时，在后台为接下来的 N 首预热各级缓存：
+  曲库元数据 → 歌词时间轴 → 封面（含在线获取）→ 缩略图
+- 切歌后重新计划，旧计划中尚未开始的任务直接跳过
+- 计划延迟 PREFETCH_DELAY 秒才开始，快速连续切歌时不会为路过的歌曲预取
+- 同时进行的预取数量有上限，不和当前播放抢资源
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+import config
+import metadata
+import thumbs
+
+
+class Prefetcher:
+    """为播放列表中的后续曲目预热缓存（线程安全）"""
+
+    def __init__(self, library, lyrics_cache, thumb_cache, pipeline=None,
+                 depth=None, concurrency=None):
+        self.library = library
+        self.lyrics_cache = lyrics_cache
+        self.thumbs = thumb_cache
+        self.pipeline = pipeline  # fetch_pipeline.FetchPipeline，None 时不做在线预取
+        self.depth = config.PREFETCH_DEPTH if depth is None else depth
+        self._pool = ThreadPoolExecutor(
+            max_workers=concurrency or config.PREFETCH_CONCURRENCY,
+            thread_name_prefix="prefetch")
+        self.delay = config.PREFETCH_DELAY
+        self._lock = threading.Lock()
+        self._timer = None
+        self._generation = 0
+        self._inflight = set()       # 正在预取的路径
+        self._done = OrderedDict()   # 最近预取完成的路径 -> 文件 (mtime, size)
+
+    def schedule(self, playlist, current_index, cover_size=None):
+        """
+        切歌后调用（Tk 主线程）：为 current_index 之后的 depth 首安排预取
+        :param cover_size: 当前窗口下的封面显示尺寸，一并预生成
+        """
+        if not playlist or self.depth <= 0:
+            return
+        n = len(playlist)
+        paths = []
+        for step in range(1, min(self.depth, n - 1) + 1):
+            path = playlist[(current_index + step) % n]
+            if path not in paths:
+                paths.append(path)
+
+        with self._lock:
+            self._generation += 1
+            gen = self._generation
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self._start, (gen, paths, cover_size))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def shutdown(self):
+        with self._lock:
+            self._generation += 1
+            if self._timer is not None:
+                self._timer.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ==================== 内部实现 ====================
+
+    def _start(self, gen, paths, cover_size):
+        """延迟结束：仍是最新计划时提交预取任务"""
+        with self._lock:
+            if self._stale(gen):
+                return
+            todo = [p for p in paths if p not in self._inflight and not self._is_done(p)]
+            self._inflight.update(todo)
+        for path in todo:
+            try:
+                self._pool.submit(self._run, gen, path, cover_size)
+            except RuntimeError:
+                return  # 已关闭
+
+    def _is_done(self, path):
+        stamp = _stamp(path)
+        done = self._done.get(path)
+        return done is not None and done == stamp
+
+    def _stale(self, gen):
+        return gen != self._generation
+
+    def _run(self, gen, path, cover_size):
+        try:
+            if self._stale(gen):
+                return
+            self._warm(gen, path, cover_size)
+        except Exception as e:
+            print(f"[预取] 失败 {os.path.basename(path)}: {e}")
+        finally:
+            with self._lock:
+                self._inflight.discard(path)
+
+    def _warm(self, gen, path, cover_size):
+        # 1. 元数据（新文件会在这里完成解析并写入曲库）
+        info = self.library.get(path)
+        if self._stale(gen):
+            return
+
+        # 2. 本地歌词；没有时走在线资源缓存 / 在线
+        t, a, d = info.title, info.artist, info.duration
+        lyrics = self.lyrics_cache.load_local(info)
+        fetcher = self.pipeline.fetcher if self.pipeline else None
+        complete = True  # 在线获取被取消时为 False，不记为完成
+        if not lyrics and fetcher:
+            lrc_path = fetcher.store.get_path(t, a, d, "lyrics")
+            if lrc_path is None:
+                complete &= _wait(self.pipeline.submit_lyrics(t, a, d, background=True))
+                lrc_path = fetcher.store.get_path(t, a, d, "lyrics")
+            if self._stale(gen):
+                return
+            if lrc_path:
+                self.lyrics_cache.load_file(lrc_path)
+
+        # 3. 封面：内嵌 → 在线资源缓存 → 在线
+        cover = metadata.open_cover(info)
+        if cover is None and fetcher:
+            jpg_path = fetcher.store.get_path(t, a, d, "cover", verify=True)
+            if jpg_path is None:
+                complete &= _wait(self.pipeline.submit_cover(t, a, d, background=True))
+                jpg_path = fetcher.store.get_path(t, a, d, "cover")
+            if jpg_path:
+                cover = metadata.LazyCover.from_file(jpg_path)
+        if self._stale(gen):
+            return
+
+        # 4. 缩略图：标准尺寸 + 背景源图 + 当前显示尺寸（一次解码全部生成）
+        if cover is not None:
+            sizes = set(thumbs.STANDARD_SIZES) | {config.BG_SOURCE_SIZE}
+            if cover_size:
+                sizes.add(cover_size)
+            for size in sorted(sizes, reverse=True):
+                self.thumbs.get(cover, size)
+
+        # 在线获取被取消，或 API 熔断期间在线部分被跳过：不记为完成，之后再预取
+        if not complete or (fetcher and fetcher.status()["state"] != "closed"):
+            return
+
+        with self._lock:
+            self._done[path] = _stamp(path)
+            self._done.move_to_end(path)
+            while len(self._done) > 256:
+                self._done.popitem(last=False)
+        print(f"[预取] ✓ {info.title}")
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime, st.st_size
+
+
+def _wait(future):
+    """
+    等待在线获取完成；合并的请求被取消（例如切歌）时不抛出，继续预热后续步骤
+    :return: 是否完成（被取消时为 False）
+    """
+    try:
+        future.result()
+        return True
+    except CancelledError:
+        return False
@@ -0,0 +1,223 @@
+# probe.py
+"""
+音频时长探测
+- 直接读取文件头，不依赖完整解析，每个文件只读取几 KB
+- MP3: Xing/Info/VBRI 帧头；没有时在几个位置采样帧头估算平均码率
+- FLAC: STREAMINFO
+- MP4/M4A: moov/mvhd
+- WAV: fmt / data 块
+"""
+import os
+import struct
+
+CHUNK = 4096  # 单次读取大小
+SAMPLE_POINTS = (0.25, 0.5, 0.75)  # MP3 无 VBR 头时的采样位置
+
+# MPEG 码率表 (kbps)，索引: [版本是否为 MPEG1][层][码率序号]
+_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# 采样率表，索引: 版本位 (3=MPEG1, 2=MPEG2, 0=MPEG2.5)
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def probe_duration(path):
+    """
+    探测音频时长（秒），无法识别时返回 0
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(12)
+            if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+                return _probe_wav(f)
+            if head[4:8] == b"ftyp":
+                return _probe_mp4(f)
+            start = _skip_id3v2(f, head)
+            f.seek(start)
+            magic = f.read(4)
+            if magic == b"fLaC":
+                return _probe_flac(f)
+            return _probe_mp3(f, start)
+    except Exception as e:
+        print(f"[时长探测] 失败 {path}: {e}")
+        return 0
+
+
+# ==================== MP3 ====================
+
+def _skip_id3v2(f, head):
+    """返回跳过 ID3v2 标签后的偏移"""
+    if head[:3] != b"ID3":
+        return 0
+    size = (head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14 | (head[8] & 0x7F) << 7 | (head[9] & 0x7F)
+    footer = 10 if head[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _parse_frame_header(b, i):
+    """
+    解析 b[i:i+4] 处的 MPEG 帧头
+    :return: (帧长, 码率bps, 采样率, 每帧采样数, 版本位, 层, 声道模式) 或 None
+    """
+    if b[i] != 0xFF or (b[i + 1] & 0xE0) != 0xE0:
+        return None
+    version = (b[i + 1] >> 3) & 0x03
+    layer_bits = (b[i + 1] >> 1) & 0x03
+    br_idx = (b[i + 2] >> 4) & 0x0F
+    sr_idx = (b[i + 2] >> 2) & 0x03
+    if version == 1 or layer_bits == 0 or br_idx in (0, 15) or sr_idx == 3:
+        return None
+    layer = 4 - layer_bits
+    mpeg1 = version == 3
+    bitrate = _BITRATES[(mpeg1, layer)][br_idx] * 1000
+    sample_rate = _SAMPLE_RATES[version][sr_idx]
+    padding = (b[i + 2] >> 1) & 0x01
+    channel_mode = (b[i + 3] >> 6) & 0x03
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or mpeg1) else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+    return length, bitrate, sample_rate, samples, version, layer, channel_mode
+
+
+def _find_frame(b):
+    """在缓冲区中找到第一个有效帧（要求紧随其后还有一个帧头以排除误匹配）"""
+    for i in range(len(b) - 4):
+        if b[i] != 0xFF:
+            continue
+        hdr = _parse_frame_header(b, i)
+        if hdr is None or hdr[0] <= 4:
+            continue
+        j = i + hdr[0]
+        if j + 4 <= len(b) and _parse_frame_header(b, j) is None:
+            continue
+        return i, hdr
+    return None, None
+
+
+def _probe_mp3(f, start):
+    f.seek(0, os.SEEK_END)
+    file_size = f.tell()
+    f.seek(file_size - 128)
+    end = file_size - 128 if f.read(3) == b"TAG" else file_size
+
+    f.seek(start)
+    buf = f.read(CHUNK)
+    pos, hdr = _find_frame(buf)
+    if hdr is None:
+        return 0
+    length, bitrate, sample_rate, samples, version, layer, channel_mode = hdr
+    audio_start = start + pos
+
+    # 1. Xing / Info 头（位于第一帧的 side info 之后）
+    if layer == 3:
+        mono = channel_mode == 3
+        side = (17 if mono else 32) if version == 3 else (9 if mono else 17)
+        x = pos + 4 + side
+        if buf[x:x + 4] in (b"Xing", b"Info"):
+            flags = struct.unpack(">I", buf[x + 4:x + 8])[0]
+            if flags & 0x01:
+                frames = struct.unpack(">I", buf[x + 8:x + 12])[0]
+                if frames:
+                    return frames * samples / sample_rate
+
+    # 2. VBRI 头（固定在帧头后 32 字节）
+    v = pos + 4 + 32
+    if buf[v:v + 4] == b"VBRI":
+        frames = struct.unpack(">I", buf[v + 14:v + 18])[0]
+        if frames:
+            return frames * samples / sample_rate
+
+    # 3. 没有 VBR 头：在几个位置采样帧头，用平均码率估算
+    bitrates = [bitrate]
+    audio_size = end - audio_start
+    for p in SAMPLE_POINTS:
+        f.seek(audio_start + int(audio_size * p))
+        _, h = _find_frame(f.read(CHUNK))
+        if h is not None:
+            bitrates.append(h[1])
+    avg = sum(bitrates) / len(bitrates)
+    return audio_size * 8 / avg if avg else 0
+
+
+# ==================== FLAC ====================
+
+def _probe_flac(f):
+    block = f.read(4 + 34)
+    if len(block) < 38 or (block[0] & 0x7F) != 0:  # 第一个块必须是 STREAMINFO
+        return 0
+    info = block[4:]
+    sample_rate = (info[10] << 12) | (info[11] << 4) | (info[12] >> 4)
+    total = ((info[13] & 0x0F) << 32) | struct.unpack(">I", info[14:18])[0]
+    if not sample_rate:
+        return 0
+    return total / sample_rate
+
+
+# ==================== MP4 / M4A ====================
+
+def _iter_atoms(f, start, end):
+    """遍历 [start, end) 范围内的 atom，只读取每个 atom 的头部"""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        hdr = f.read(8)
+        if len(hdr) < 8:
+            return
+        size, kind = struct.unpack(">I4s", hdr)
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind, pos + header, pos + size
+        pos += size
+
+
+def _probe_mp4(f):
+    f.seek(0, os.SEEK_END)
+    file_size = f.tell()
+    for kind, body, end in _iter_atoms(f, 0, file_size):
+        if kind != b"moov":
+            continue
+        for child, cbody, _ in _iter_atoms(f, body, end):
+            if child != b"mvhd":
+                continue
+            f.seek(cbody)
+            data = f.read(32)
+            if data[0] == 1:
+                timescale, duration = struct.unpack(">IQ", data[20:32])
+            else:
+                timescale, duration = struct.unpack(">II", data[12:20])
+            return duration / timescale if timescale else 0
+    return 0
+
+
+# ==================== WAV ====================
+
+def _probe_wav(f):
+    f.seek(0, os.SEEK_END)
+    file_size = f.tell()
+    f.seek(12)
+    byte_rate = 0
+    pos = 12
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        kind, size = struct.unpack("<4sI", f.read(8))
+        if kind == b"fmt ":
+            byte_rate = struct.unpack("<I", f.read(12)[8:12])[0]
+        elif kind == b"data":
+            size = min(size, file_size - pos - 8)
+            return size / byte_rate if byte_rate else 0
+        pos += 8 + size + (size & 1)
+    return 0
@@ -0,0 +1,150 @@
+# render_worker.py
+"""
+后台渲染线程
+- 封面解码 / 缩放、背景模糊等 PIL 操作在后台线程执行（耗时部分在 PIL 的 C 代码中，
+  不持有 GIL），Tk 主线程只负责显示，歌词滚动和进度条不再被卡住
+- 只保留最新的请求：连续切歌或窗口尺寸变化时，尚未开始的旧请求直接被替换
+- 结果交给主线程后 paste() 进常驻的 PhotoImage（PhotoSlot 双缓冲），
+  尺寸不变时不再创建新的 PhotoImage
+- 最近几次的渲染结果按 (封面, 窗口尺寸) 保留，在两个常用尺寸之间切换时直接显示
+"""
+import threading
+from collections import namedtuple, OrderedDict
+from PIL import ImageTk
+import config
+
+# seq: 请求序号；plate: background.Plate；cover_image: 显示尺寸的封面
+RenderResult = namedtuple("RenderResult", "seq cover plate cover_image")
+
+
+class RenderWorker:
+    """背景 + 封面渲染线程"""
+
+    def __init__(self, thumb_cache, engine, deliver, cache_items=None):
+        """
+        :param engine: background.BackgroundEngine
+        :param deliver: fn(RenderResult)，在渲染线程中调用，负责把结果交给 Tk 主线程
+        """
+        self.thumbs = thumb_cache
+        self.background = engine
+        self.deliver = deliver
+        self.cache_items = cache_items or config.RENDER_CACHE_ITEMS
+        self._cond = threading.Condition()
+        self._pending = None  # 等待渲染的最新请求
+        self._seq = 0
+        self._closed = False
+        self._results = OrderedDict()  # (封面, 宽, 高, 封面尺寸) -> RenderResult
+        self._thread = threading.Thread(target=self._loop, name="render", daemon=True)
+        self._thread.start()
+
+    def request(self, cover, win_w, win_h, cover_size):
+        """
+        请求渲染（Tk 主线程调用，立即返回）
+        :return: 请求序号，结果的 seq 与最新序号不同时说明已过期
+        """
+        with self._cond:
+            self._seq += 1
+            self._pending = (self._seq, cover, win_w, win_h, cover_size)
+            self._cond.notify()
+            return self._seq
+
+    def cached(self, cover, win_w, win_h, cover_size):
+        """已渲染过的结果（没有时返回 None）"""
+        key = (cover, win_w, win_h, cover_size)
+        with self._cond:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+            return result
+
+    def cancel(self):
+        """丢弃尚未完成的请求（直接显示缓存结果时调用，避免旧结果随后覆盖）"""
+        with self._cond:
+            self._seq += 1
+            self._pending = None
+
+    def is_latest(self, seq):
+        with self._cond:
+            return seq == self._seq
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            self._pending = None
+            self._cond.notify()
+
+    # ==================== 内部实现 ====================
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                job, self._pending = self._pending, None
+            seq, cover, win_w, win_h, cover_size = job
+            try:
+                result = self._render(*job)
+            except Exception as e:
+                # 例如缓存的封面文件已被外部删除：改用默认封面，界面仍切换到当前歌曲
+                print(f"[渲染] 失败，使用默认封面: {e}")
+                try:
+                    result = self._render(seq, None, win_w, win_h, cover_size)
+                except Exception as e:
+                    print(f"[渲染] 默认封面渲染失败: {e}")
+                    continue
+            else:
+                if result.plate is not None:
+                    self._remember(job[1:], result)
+            if self.is_latest(result.seq):
+                self.deliver(result)
+
+    def _render(self, seq, cover, win_w, win_h, cover_size):
+        cover_image = self.thumbs.get(cover, cover_size)
+        if not self.is_latest(seq):
+            return RenderResult(seq, cover, None, None)  # 已有新请求，跳过背景
+        plate = self.background.plate(cover, win_w, win_h)
+        return RenderResult(seq, cover, plate, cover_image)
+
+    def _remember(self, key, result):
+        with self._cond:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.cache_items:
+                self._results.popitem(last=False)
+
+
+class PhotoSlot:
+    """
+    Canvas 图像对象的双缓冲 PhotoImage（只在 Tk 主线程使用）
+    - 新图片 paste() 进未显示的缓冲区（paste 进正在显示的 PhotoImage 会很慢），
+      再切换 Canvas 显示的缓冲区
+    - 最近 keep 种尺寸的缓冲区都保留，尺寸来回切换时不重新创建 PhotoImage
+    """
+
+    def __init__(self, canvas, item, keep=2):
+        self.canvas = canvas
+        self.item = item
+        self.keep = keep
+        self._pairs = OrderedDict()  # 尺寸 -> [缓冲区0, 缓冲区1, 显示中的序号]
+        self._shown = None           # 正在显示的 PhotoImage
+
+    def show(self, pil_img):
+        size = pil_img.size
+        pair = self._pairs.get(size)
+        if pair is None:
+            pair = [ImageTk.PhotoImage(pil_img), None, 0]
+            self._pairs[size] = pair
+            while len(self._pairs) > self.keep:
+                self._pairs.popitem(last=False)
+        else:
+            self._pairs.move_to_end(size)
+            back = 1 - pair[2]
+            if pair[back] is None:
+                pair[back] = ImageTk.PhotoImage(pil_img)
+            else:
+                pair[back].paste(pil_img)
+            pair[2] = back
+        self._shown = pair[pair[2]]
+        self.canvas.itemconfig(self.item, image=self._shown)
@@ -0,0 +1,150 @@
+# scanner.py
+"""
+曲库扫描器
+- 接受文件或文件夹（递归查找音频文件）
+- 用进程池并行解析元数据，按批次写入曲库索引
+- 在后台线程运行，通过回调分批汇报进度（回调在后台线程中执行）
+- 多次导入可以同时进行，每次扫描有自己的取消事件
+"""
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import metadata
+
+AUDIO_EXTS = ('.mp3', '.wav', '.flac', '.m4a')
+
+# 少量文件时直接在线程内解析，省去启动进程池的开销
+POOL_THRESHOLD = 16
+
+
+def is_audio_file(path):
+    return path.lower().endswith(AUDIO_EXTS)
+
+
+def expand_paths(paths):
+    """把文件/文件夹列表展开为音频文件列表（保持输入顺序，文件夹内按名称排序）"""
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            for root, dirs, names in os.walk(p):
+                dirs.sort()
+                for name in sorted(names):
+                    if is_audio_file(name):
+                        files.append(os.path.join(root, name))
+        elif os.path.isfile(p) and is_audio_file(p):
+            files.append(p)
+    return files
+
+
+def _extract_batch(paths):
+    """子进程中执行：解析一批文件，返回 [(TrackInfo, (mtime, size)), ...]"""
+    results = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            info = metadata.read_track_info(path)
+            results.append((info, (st.st_mtime, st.st_size)))
+        except Exception as e:
+            print(f"[扫描] 解析失败 {path}: {e}")
+    return results
+
+
+class LibraryScanner:
+    """并行曲库扫描器"""
+
+    def __init__(self, library, max_workers=None, batch_size=32):
+        self.library = library
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.batch_size = batch_size
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._scans = set()  # 进行中扫描的取消事件
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # 固定用 spawn（与 Windows 一致）：Linux 默认的 fork 在其他扫描线程持有锁时会使子进程死锁
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def scan(self, paths, on_files=None, on_batch=None, on_done=None):
+        """
+        开始后台扫描
+        :param on_files: on_files(files) 展开后的音频文件列表
+        :param on_batch: on_batch(infos, done, total) 每批解析完成
+        :param on_done: on_done(total) 全部完成
+        :return: 本次扫描的取消事件（set() 只取消这一次扫描）
+        """
+        cancel = threading.Event()
+        with self._pool_lock:
+            self._scans.add(cancel)
+        threading.Thread(
+            target=self._run, args=(list(paths), on_files, on_batch, on_done, cancel), daemon=True).start()
+        return cancel
+
+    def cancel(self):
+        """取消所有进行中的扫描"""
+        with self._pool_lock:
+            for cancel in self._scans:
+                cancel.set()
+
+    def _run(self, paths, on_files, on_batch, on_done, cancel):
+        try:
+            self._scan(paths, on_files, on_batch, on_done, cancel)
+        except Exception as e:
+            print(f"[扫描] 失败: {e}")
+            if on_done:
+                on_done(0)  # 保证调用方收到结束通知
+        finally:
+            with self._pool_lock:
+                self._scans.discard(cancel)
+
+    def _scan(self, paths, on_files, on_batch, on_done, cancel):
+        files = expand_paths(paths)
+        if on_files:
+            on_files(files)
+
+        # 索引中已有且未变化的文件不再解析
+        todo = [f for f in files if not self.library.is_fresh(f)]
+        total = len(todo)
+        done = 0
+        print(f"[扫描] 共 {len(files)} 个文件，需解析 {total} 个")
+
+        if total and total <= POOL_THRESHOLD:
+            results = _extract_batch(todo)
+            self.library.put_many(results)
+            done = total
+            if on_batch:
+                on_batch([info for info, _ in results], done, total)
+        elif total:
+            pool = self._get_pool()
+            futures = {}
+            for i in range(0, total, self.batch_size):
+                batch = todo[i:i + self.batch_size]
+                futures[pool.submit(_extract_batch, batch)] = len(batch)
+            for fut in as_completed(futures):
+                if cancel.is_set():
+                    for f in futures:
+                        f.cancel()
+                    break
+                done += futures[fut]
+                try:
+                    results = fut.result()
+                except Exception as e:
+                    print(f"[扫描] 批次失败: {e}")
+                    continue
+                self.library.put_many(results)
+                if on_batch:
+                    on_batch([info for info, _ in results], done, total)
+
+        if on_done:
+            on_done(total)
+
+    def shutdown(self):
+        self.cancel()
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
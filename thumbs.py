@@ -0,0 +1,231 @@
+# thumbs.py
+"""
+封面缩略图缓存
+- 以封面字节的 SHA1 为键，同一专辑的曲目共享同一组缩略图
+- 预生成多种尺寸（50 / 128 / 256 及当前显示尺寸）
+- 磁盘存储为 SQLite 中的 JPEG 数据，超出容量按最近访问时间淘汰
+- 命中时只在内存中记录访问时间，随下一次写入 / 淘汰 / close() 批量写回
+- 内存中保留最近使用的解码结果
+"""
+import io
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from PIL import Image
+import config
+import metadata
+import utils
+
+# 预生成的标准尺寸
+STANDARD_SIZES = (50, 128, 256)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS thumbs (
+    digest  TEXT NOT NULL,
+    size    INTEGER NOT NULL,
+    data    BLOB NOT NULL,
+    bytes   INTEGER NOT NULL,
+    atime   REAL NOT NULL,
+    PRIMARY KEY (digest, size)
+);
+CREATE INDEX IF NOT EXISTS idx_thumbs_atime ON thumbs(atime);
+"""
+
+
+class ThumbnailCache:
+    """多尺寸封面缩略图缓存（线程安全）"""
+
+    def __init__(self, db_path=None, max_bytes=None, memory_items=64):
+        self.db_path = db_path or os.path.join(utils.get_cache_dir(), "thumbs.db")
+        self.max_bytes = max_bytes or config.THUMB_CACHE_MAX_BYTES
+        self.memory_items = memory_items
+        self._lock = threading.RLock()
+        self._memory = OrderedDict()   # (digest, size) -> PIL Image
+        self._sources = OrderedDict()  # digest -> 解码后的源图（缩放用）
+        self._touched = {}             # (digest, size) -> 尚未写回的访问时间
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._total = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM thumbs").fetchone()[0]
+
+    # ==================== 公开接口 ====================
+
+    def get(self, cover, size):
+        """
+        获取 size×size 的封面
+        :param cover: metadata.LazyCover，None 表示默认封面
+        :return: PIL Image (RGB)
+        """
+        if cover is None:
+            return self._default(size)
+
+        digest = cover.digest
+        if not digest:
+            cover.data()  # 读取字节后才有摘要
+            digest = cover.digest
+        if not digest:
+            return self._default(size)
+
+        key = (digest, size)
+        with self._lock:
+            img = self._memory.get(key)
+            if img is not None:
+                self._memory.move_to_end(key)
+                return img
+
+        img = self._load(digest, size)
+        if img is None:
+            img = self._generate(cover, digest, size)
+        if img is None:
+            return self._default(size)
+        self._remember(key, img)
+        return img
+
+    def stats(self):
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM thumbs").fetchone()[0]
+        return {"entries": count, "bytes": self._total, "max_bytes": self.max_bytes}
+
+    def flush(self):
+        """把内存中的访问时间写回磁盘"""
+        with self._lock:
+            if self._touched:
+                self._flush_atimes()
+                self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+    # ==================== 内部实现 ====================
+
+    def _default(self, size):
+        key = ("default", size)
+        with self._lock:
+            img = self._memory.get(key)
+        if img is None:
+            img = metadata.get_default_cover().resize((size, size))
+            self._remember(key, img)
+        return img
+
+    def _remember(self, key, img):
+        with self._lock:
+            self._memory[key] = img
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _load(self, digest, size):
+        """从磁盘读取缩略图，访问时间先记在内存中"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM thumbs WHERE digest=? AND size=?", (digest, size)).fetchone()
+            if row is None:
+                return None
+            self._touched[(digest, size)] = time.time()
+        try:
+            img = Image.open(io.BytesIO(row[0]))
+            img.load()
+            return img
+        except Exception:
+            return None
+
+    def _source(self, cover, digest, size):
+        """解码源图（按需要的最大尺寸缩小解码），最近几张保留在内存中"""
+        need = max(size, STANDARD_SIZES[-1])
+        with self._lock:
+            src = self._sources.get(digest)
+        if src is not None and min(src.size) >= need:
+            return src
+        src = cover.preview(need)
+        if src is not None:
+            with self._lock:
+                self._sources[digest] = src
+                while len(self._sources) > 4:
+                    self._sources.popitem(last=False)
+        return src
+
+    def _generate(self, cover, digest, size):
+        """缓存未命中：解码一次，生成标准尺寸和请求尺寸并写入磁盘"""
+        src = self._source(cover, digest, size)
+        if src is None:
+            return None
+
+        result = None
+        rows = []
+        now = time.time()
+        for s in sorted(set(STANDARD_SIZES) | {size}):
+            if s != size and self._exists(digest, s):
+                continue
+            variant = src.resize((s, s), Image.Resampling.LANCZOS)
+            buf = io.BytesIO()
+            variant.save(buf, "JPEG", quality=90)
+            data = buf.getvalue()
+            rows.append((digest, s, data, len(data), now))
+            if s == size:
+                result = variant
+            else:
+                self._remember((digest, s), variant)
+
+        with self._lock:
+            for row in rows:
+                old = self._conn.execute(
+                    "SELECT bytes FROM thumbs WHERE digest=? AND size=?", row[:2]).fetchone()
+                if old:
+                    self._total -= old[0]
+                self._conn.execute("INSERT OR REPLACE INTO thumbs VALUES (?,?,?,?,?)", row)
+                self._total += row[3]
+                self._touched.pop(row[:2], None)
+            self._flush_atimes()  # 随本次写入一并提交
+            self._conn.commit()
+            self._evict()
+        return result
+
+    def _exists(self, digest, size):
+        with self._lock:
+            if (digest, size) in self._memory:
+                return True
+            return self._conn.execute(
+                "SELECT 1 FROM thumbs WHERE digest=? AND size=?", (digest, size)).fetchone() is not None
+
+    def _evict(self):
+        """超出容量时按最近访问时间淘汰，淘汰到容量的 90%"""
+        if self._total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        self._flush_atimes()  # 按最新的访问时间淘汰
+        rows = self._conn.execute("SELECT digest, size, bytes FROM thumbs ORDER BY atime").fetchall()
+        removed = []
+        for digest, size, nbytes in rows:
+            if self._total <= target:
+                break
+            removed.append((digest, size))
+            self._total -= nbytes
+        self._conn.executemany("DELETE FROM thumbs WHERE digest=? AND size=?", removed)
+        self._conn.commit()
+        print(f"[缩略图] 淘汰 {len(removed)} 项，当前 {self._total // 1024} KB")
+
+    def _flush_atimes(self):
+        """写回积累的访问时间（调用方持有锁并负责 commit）"""
+        if not self._touched:
+            return
+        self._conn.executemany("UPDATE thumbs SET atime=? WHERE digest=? AND size=?",
+                               [(atime, *key) for key, atime in self._touched.items()])
+        self._touched.clear()
+
+
+# ==================== 全局实例 ====================
+
+_cache = None
+
+def get_thumbnail_cache():
+    """获取全局缩略图缓存实例"""
+    global _cache
+    if _cache is None:
+        _cache = ThumbnailCache()
+    return _cache
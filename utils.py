@@ -1,4 +1,5 @@
 import os
+import sys
 import ctypes
 import tkinter as tk
 from tkinter import font
@@ -9,6 +10,18 @@ def load_font_and_get_name():
 
 REAL_FONT_NAME = load_font_and_get_name()
 
+def get_app_dir():
+    """程序所在目录（兼容脚本和EXE）"""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+def get_cache_dir():
+    """sinf 缓存目录，不存在时自动创建"""
+    cache_dir = os.path.join(get_app_dir(), "sinf")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
 def fmt_time(sec):
     return f"{int(sec//60)}:{int(sec%60):02}"
 